@@ -0,0 +1,60 @@
+import numpy as np
+import batch, rk
+
+# one impact(v0, angle) for every model of the banana flight, the cheapest exact method is picked from the model constants:
+#   no drag:     closed form, t = -2 vy/g and x = vx t
+#   linear drag: the exponential solution (gt(t) in banana.py), its ground crossing found by a few Newton steps
+#   otherwise:   numeric integration, adaptive Runge-Kutta (rk.py)
+# All of them take arrays of launch parameters and answer for all of them at once.
+
+class Model:
+    def __init__(self, g=-9.81, m=.5, mu=0., wind=(0., 0.), k=0.):
+        self.g, self.m, self.mu, self.wind = g, m, mu, np.array(wind, dtype=float)
+        self.k = k # quadratic drag coefficient, kg/m: the drag force is -k |v - wind| (v - wind)
+
+    def backend(self):
+        if self.k: return 'numeric'
+        return 'analytic' if self.mu == 0 else 'exponential'
+
+    def acceleration(self, state): # for the numeric integration
+        v = state[:,2:] - self.wind
+        return np.array([0, self.g]) - (self.mu + self.k*np.linalg.norm(v, axis=1, keepdims=True))/self.m*v
+
+drag_free = Model()
+
+def position(model, v0, t): # the exponential solution with linear drag, launched from the origin; (N,2) velocities, (N,) times
+    tau, w, g = model.m/model.mu, model.wind, np.array([0, model.g])
+    return t[:,None]*(w + tau*g) + tau*(v0 - w - tau*g)*(1 - np.exp(-t/tau))[:,None], \
+           w + tau*g + (v0 - w - tau*g)*np.exp(-t/tau)[:,None]
+
+def impact(v0, angle, model=drag_free, tol=1e-6): # impact abscissae and times of flight for speeds v0 and angles (degrees), broadcast
+    v0, angle = np.broadcast_arrays(np.asarray(v0, dtype=float), np.asarray(angle, dtype=float))
+    shape = v0.shape
+    vx, vy = (v0*np.cos(angle*np.pi/180)).ravel(), (v0*np.sin(angle*np.pi/180)).ravel()
+    kind = model.backend()
+    if kind == 'analytic':
+        t = np.maximum(-2*vy/model.g, 0)
+        x = vx*t
+    elif kind == 'exponential':
+        t = np.maximum(-2*vy/model.g, 0) # the drag-free flight is longer: start beyond the root, y(t) is concave,
+        for _ in range(50):              # so that Newton steps go down to it monotonically
+            p, v = position(model, np.stack((vx, vy), axis=1), t)
+            step = np.where(t > 0, p[:,1]/np.where(v[:,1] < 0, v[:,1], -1), 0)
+            t = np.maximum(t - step, 0)
+            if np.all(np.abs(step) <= 1e-12*(1 + t)): break
+        x = position(model, np.stack((vx, vy), axis=1), t)[0][:,0]
+    else:
+        final, t, _ = rk.simulate(np.stack((0*vx, 0*vy, vx, vy), axis=1), model.acceleration, rtol=tol, atol=tol)
+        x = final[:,0]
+    return x.reshape(shape), t.reshape(shape)
+
+if __name__ == '__main__': # the three backends against the Euler integration, and their speed
+    import time
+    for model in [drag_free, Model(mu=.1), Model(mu=.1, wind=(-40, 0)), Model(k=.01)]:
+        speed, angles = 30, np.linspace(5., 85., 100)
+        start = time.time()
+        x, t = impact(speed, angles, model)
+        elapsed = time.time() - start
+        final, tt = batch.simulate(batch.launch(speed, angles), 1e-5, g=model.g, acceleration=model.acceleration)
+        print("%-11s %8.1f us per toss, max deviation from Euler at dt=1e-5: %.2e m, %.2e s" %
+              (model.backend(), elapsed/len(angles)*1e6, np.abs(x - final[:,0]).max(), np.abs(t - tt).max()))
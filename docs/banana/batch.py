@@ -0,0 +1,68 @@
+import numpy as np
+
+# the banana scripts step one toss at a time with the explicit Euler scheme; here N tosses are advanced together,
+# the state is a (N, 4) array of rows x, y, vx, vy, so a whole grid of launches costs about one trajectory of Python overhead.
+# The tosses that have already landed are dropped from the arrays, and each one gets its own ground crossing interpolation.
+
+g = -9.81 # gravity, m/s^2
+
+def launch(speed, angle): # initial states, speeds in m/s and angles in degrees wrt the ground, broadcast against each other
+    speed, angle = np.broadcast_arrays(np.asarray(speed, dtype=float), np.asarray(angle, dtype=float)*np.pi/180)
+    return np.stack((np.zeros(speed.size), np.zeros(speed.size), (speed*np.cos(angle)).ravel(), (speed*np.sin(angle)).ravel()), axis=1)
+
+def ground(state): # the events are the sign changes of a function of the state, from >= 0 to < 0
+    return state[:,1]
+
+def simulate(state, dt=.001, event=ground, path=False, g=g, acceleration=None):
+    # returns the states at the event (N, 4) and the times of flight (N,); with path=True, the (steps+1, N, 2) positions too,
+    # padded with nans once the toss is over. Gravity only by default, acceleration(state) gives the (N, 2) accelerations otherwise (drag...)
+    state = np.array(state, dtype=float)
+    final, time = np.copy(state), np.zeros(len(state))
+    alive, t = np.arange(len(state)), 0.
+    positions = [np.copy(state[:,:2])] if path else None
+    step = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [dt, 0, 1, 0], [0, dt, 0, 1]]) # one Euler step is an affine map of the state,
+    kick = np.array([0, 0, 0, g*dt])                                            # same update order as the scripts: positions move with the old velocities
+    f0 = event(state)
+    while len(alive):
+        before, state = state, state @ step + kick
+        if acceleration is not None:
+            state[:,2:] = before[:,2:] + dt*acceleration(before)
+        t += dt
+        f1 = event(state)
+        done = f1 < 0
+        if path:
+            p = np.full((len(final), 2), np.nan)
+            p[alive] = state[:,:2]
+            positions.append(p)
+        if done.any():
+            u = f0[done]/(f0[done] - f1[done])                  # linear interpolation of the crossing, one per toss
+            final[alive[done]] = before[done] + u[:,None]*(state[done] - before[done])
+            time[alive[done]] = t - dt + u*dt
+            if path: p[alive[done]] = final[alive[done],:2]
+            state, alive, f1 = state[~done], alive[~done], f1[~done]
+        f0 = f1
+    return (final, time, np.array(positions)) if path else (final, time)
+
+if __name__ == '__main__': # a 100-angle grid search, one toss at a time against all at once
+    import time as clock
+    speed, angles = 30, np.linspace(0., 90., 100)
+    start = clock.time()
+    ranges = []
+    for a in angles:
+        x, y = 0, 0
+        vx, vy = speed*np.cos(a*np.pi/180), speed*np.sin(a*np.pi/180)
+        xs, ys, dt = [x], [y], .001
+        while y >= 0:
+            x += dt*vx
+            y += dt*vy
+            vy += g*dt
+            xs.append(x)
+            ys.append(y)
+        u = ys[-2]/(ys[-2]-ys[-1])
+        ranges.append(xs[-2] + u*(xs[-1]-xs[-2]))
+    scalar = clock.time() - start
+    start = clock.time()
+    final, _ = simulate(launch(speed, angles))
+    batched = clock.time() - start
+    print("one at a time: %.2fs, batched: %.3fs, same ranges: %s" % (scalar, batched, np.allclose(ranges, final[:,0])))
+    print("best angle %.1f degrees, range %.2f m" % (angles[np.argmax(final[:,0])], final[:,0].max()))
@@ -1,27 +1,11 @@
 import matplotlib.pyplot as plt
 import numpy as np
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from batch import launch, simulate
 
-g     = -9.81 # gravity, m/s^2
 speed = 30    # initial speed (m/s)
 
-def simulate(angle):
-    x, y = 0, 0   # current state
-    vx, vy = speed * np.cos(angle * np.pi/180), \
-             speed * np.sin(angle * np.pi/180)
-    dt = .01
-    xs, ys = [x], [y]
-    while y >= 0:
-        x += dt * vx
-        y += dt * vy
-        vy += g * dt
-        xs.append(x)
-        ys.append(y)
-    u = ys[-2]/(ys[-2]-ys[-1])
-    xs[-1] = xs[-2] + u*(xs[-1]-xs[-2])
-    ys[-1] = 0
-    plt.plot(xs, ys)
-    return xs, ys
-
 plt.figure(figsize=(16, 9))
 plt.rcParams["font.family"] = "serif"
 plt.rcParams["mathtext.fontset"] = "dejavuserif"
@@ -32,7 +16,9 @@ plt.title('Grid search: running out of bananas')
 plt.grid(color='gray', linestyle='--', linewidth=0.5)
 
 angles = np.linspace(0., 90., 100)
-range = [ simulate(a)[0][-1] for a in angles ]
+final, _, path = simulate(launch(speed, angles), dt=.01, path=True) # all the tosses at once
+plt.plot(path[...,0], path[...,1])
+range = final[:,0]
 
 #plt.plot(angles, range)
 #plt.plot(xs, [0]*len(xs))
@@ -1,28 +1,12 @@
 import numpy as np
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from batch import launch, simulate
 
-g     = -9.81 # gravity, m/s^2
 speed = 30    # initial speed (m/s)
 
-
-def simulate(angle):
-    x, y = 0, 0   # current state
-    vx, vy = speed * np.cos(angle * np.pi/180), \
-             speed * np.sin(angle * np.pi/180)
-    dt = .001
-    xs, ys = [x], [y]
-    while y >= 0:
-        x += dt * vx
-        y += dt * vy
-        vy += g * dt
-        xs.append(x)
-        ys.append(y)
-    u = ys[-2]/(ys[-2]-ys[-1])
-    xs[-1] = xs[-2] + u*(xs[-1]-xs[-2])
-    ys[-1] = 0
-    return xs, ys
-
 angles = np.linspace(0., 90., 100)
-range = [ simulate(a)[0][-1] for a in angles ]
+range = simulate(launch(speed, angles))[0][:,0] # the 100 tosses advance together
 
 import matplotlib.pyplot as plt
 plt.figure(figsize=(16, 9))
@@ -0,0 +1,85 @@
+import inspect
+from collections import OrderedDict
+import numpy as np
+import backend
+
+# bounded LRU memo of the impact evaluations: the root finders ask for the same launches over and over
+# (the midpoints of a bisection from a common bracket are shared by all the targets, the ternary search of least-effort.py
+# re-runs a bisection per probe...), so that a launch is keyed by its parameters quantized to a grid and the model constants,
+# and simulated only the first time. The misses of a batched call are simulated together, in one call of the wrapped function.
+
+def constants(item): # a hashable image of the options: numbers, strings, arrays, lists, dicts and plain objects (a backend.Model)
+    if isinstance(item, np.ndarray):
+        return (item.dtype.str, item.shape, item.tobytes())
+    if isinstance(item, (list, tuple)):
+        return tuple(constants(x) for x in item)
+    if isinstance(item, dict):
+        return tuple((k, constants(item[k])) for k in sorted(item))
+    if hasattr(item, '__dict__'):
+        return (type(item).__name__, constants(vars(item)))
+    return item
+
+class Memo:
+    def __init__(self, function, nargs=2, maxsize=1<<16, resolution=1e-9):
+        # function(*arrays, **options) -> array or tuple of arrays, element-wise in its nargs leading arguments (broadcast arrays);
+        # the other arguments (a backend.Model...) are a part of the key, whether they are given by position or by name
+        self.function, self.nargs, self.maxsize, self.resolution = function, nargs, maxsize, resolution
+        self.signature = inspect.signature(function)
+        self.entries, self.hits, self.misses = OrderedDict(), 0, 0
+
+    def __call__(self, *args, **options):
+        bound = self.signature.bind(*args, **options)
+        bound.apply_defaults()
+        names = list(bound.arguments)
+        args = np.broadcast_arrays(*[ np.asarray(bound.arguments[k], dtype=float) for k in names[:self.nargs] ])
+        options = { k: bound.arguments[k] for k in names[self.nargs:] }
+        shape = args[0].shape
+        grid = np.round(np.stack([ a.ravel() for a in args ], axis=1)/self.resolution).astype(np.int64) # (N, number of arguments)
+        context = constants(options)
+        keys = [ (context,) + tuple(row) for row in grid.tolist() ]
+        missing = list(dict.fromkeys(k for k in keys if k not in self.entries))
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+        if missing: # evaluated at the quantized launch parameters, the answer does not depend on which launch came first
+            q = np.array([ k[1:] for k in missing ], dtype=float)*self.resolution
+            values = self.function(*q.T, **options)
+            single = not isinstance(values, tuple)
+            for k, v in zip(missing, zip(*((values,) if single else values))):
+                self.entries[k] = v[0] if single else v
+        for k in keys:
+            self.entries.move_to_end(k)
+        out = [ self.entries[k] for k in keys ]
+        while len(self.entries) > self.maxsize: # least recently used first, after the answer is gathered
+            self.entries.popitem(last=False)
+        if out and isinstance(out[0], tuple):
+            return tuple(np.array(v).reshape(shape) for v in zip(*out))
+        return np.array(out).reshape(shape)
+
+    def hit_rate(self):
+        return self.hits/max(self.hits + self.misses, 1)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits, self.misses = 0, 0
+
+    def __repr__(self):
+        return "%d hits, %d misses (%.1f%%), %d/%d entries" % (self.hits, self.misses, 100*self.hit_rate(), len(self.entries), self.maxsize)
+
+impact = Memo(backend.impact) # impact(v0, angle, model, tol) -> x, t, a drop-in replacement for backend.impact
+
+if __name__ == '__main__': # the bisection of target/convergence-x-bisection.py, 128 targets, quadratic drag, swept twice
+    import time, random
+    random.seed(1)
+    model, targets = backend.Model(k=.01), [ random.uniform(1, 30) for _ in range(128) ]
+    for sweep in range(2):
+        start, bananas = time.time(), 0
+        for xstar in targets:
+            a, b = 0, 35
+            while True:
+                m = (a + b)/2
+                x, _ = impact(m, 60, model=model)
+                bananas += 1
+                if x < xstar: a = m
+                else: b = m
+                if abs(x - xstar) < 1e-3: break
+        print("sweep %d: %d bananas in %.2fs, %s" % (sweep, bananas, time.time() - start, impact))
@@ -0,0 +1,66 @@
+import numpy as np
+import batch
+
+# adaptive Runge-Kutta integration of N tosses at once: the Bogacki-Shampine 3(2) pair (the one behind ode23),
+# every toss with its own step size driven by the embedded error estimate, steps rejected and retried per toss.
+# The events (ground, a target line...) are located on the cubic Hermite dense output of the step that crosses them,
+# instead of stepping past the event and interpolating linearly.
+
+def derivative(acceleration): # state (N, 4) = x, y, vx, vy
+    return lambda s: np.hstack((s[:,2:], acceleration(s)))
+
+def gravity(g=batch.g):
+    return lambda s: np.tile([0., g], (len(s), 1))
+
+def hermite(s0, s1, f0, f1, h, theta): # dense output within a step, theta in [0,1]
+    t2, t3 = theta**2, theta**3
+    return (2*t3 - 3*t2 + 1)*s0 + (t3 - 2*t2 + theta)*h*f0 + (-2*t3 + 3*t2)*s1 + (t3 - t2)*h*f1
+
+def simulate(state, acceleration=gravity(), event=batch.ground, rtol=1e-6, atol=1e-6, h=.01, tmax=1e3):
+    # returns the states at the event (N, 4), the times of the event (N,) and the number of steps taken (N,), rejected ones included
+    f = derivative(acceleration)
+    s = np.array(state, dtype=float)
+    n = len(s)
+    final, time, steps = np.copy(s), np.full(n, np.inf), np.zeros(n, dtype=int)
+    alive, t, h = np.arange(n), np.zeros(n), np.full(n, h)
+    k1, crossing = f(s), []
+    while len(alive):
+        hh = h[:,None]
+        k2 = f(s + hh/2*k1)
+        k3 = f(s + 3*hh/4*k2)
+        s1 = s + hh*(2/9*k1 + 1/3*k2 + 4/9*k3)       # third order solution
+        k4 = f(s1)                                   # first same as last: k1 of the next step
+        error = hh*(-5/72*k1 + 1/12*k2 + 1/9*k3 - 1/8*k4) # difference with the embedded second order solution
+        error = np.max(np.abs(error)/(atol + rtol*np.maximum(np.abs(s), np.abs(s1))), axis=1)
+        steps[alive] += 1
+        ok = error <= 1
+        crossed = ok & (event(s1) < 0)
+        if crossed.any(): # the steps that cross the event are kept aside, to be searched all together at the end
+            crossing.append((alive[crossed], t[crossed], h[crossed], s[crossed], s1[crossed], k1[crossed], k4[crossed]))
+        t = np.where(ok, t + h, t)
+        s, k1 = np.where(ok[:,None], s1, s), np.where(ok[:,None], k4, k1)
+        h = h*np.clip(.9*np.maximum(error, 1e-10)**(-1/3), .2, 5) # the usual step size controller, third order
+        keep = ~crossed & (t < tmax)
+        s, k1, t, h, alive = s[keep], k1[keep], t[keep], h[keep], alive[keep]
+    if crossing: # bisection of the event function along the dense output of the crossing steps
+        idx, t, h, s0, s1, k1, k4 = [ np.concatenate(a) for a in zip(*crossing) ]
+        lo, hi = np.zeros(len(idx)), np.ones(len(idx))
+        for _ in range(50):
+            mid = (lo + hi)/2
+            below = event(hermite(s0, s1, k1, k4, h[:,None], mid[:,None])) < 0
+            lo, hi = np.where(below, lo, mid), np.where(below, mid, hi)
+        final[idx], time[idx] = hermite(s0, s1, k1, k4, h[:,None], hi[:,None]), t + hi*h
+    return final, time, steps
+
+if __name__ == '__main__': # linear drag against its exponential solution, and the same against Euler with dt = .001
+    import backend
+    model, speed, angles = backend.Model(mu=.1, wind=(-5, 0)), 30, np.linspace(5., 85., 100)
+    state = batch.launch(speed, angles)
+    exact, _ = backend.impact(speed, angles, model)
+    euler, te = batch.simulate(state, .001, acceleration=model.acceleration)
+    print("Euler dt=.001: %5d steps per toss, max range error %.1e m" % (np.mean(te/.001), np.abs(euler[:,0] - exact).max()))
+    for tol in [1e-3, 1e-4, 1e-6]:
+        final, t, steps = simulate(state, model.acceleration, rtol=tol, atol=tol)
+        print("BS3 tol=%.0e: %5.1f steps per toss, max range error %.1e m" % (tol, steps.mean(), np.abs(final[:,0] - exact).max()))
+    final, t, steps = simulate(state, model.acceleration, event=lambda s: 20 - s[:,0]) # the first time x >= 20
+    print("x >= 20 located at %.1e m" % np.nanmax(np.abs(final[t < np.inf,0] - 20)))
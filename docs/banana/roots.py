@@ -0,0 +1,171 @@
+import numpy as np
+
+# the root finders of target/*.py, for many targets at once: solve f(p) = target for every target, each one with its own bracket
+# and its own state, and all the targets still searching are launched together, one call of f per iteration.
+# f takes an array of parameters (e.g. the speeds v0) and answers an array of values (e.g. the impact abscissae), see backend.impact.
+# A bracket (a, b) has f(a) < target <= f(b), a > b is fine for a decreasing f.
+# Every method works with the residuals r = f - target, and the state of the searching targets is a dict of arrays.
+
+class Bisection:
+    endpoints = False # whether f(a) and f(b) are needed before the first iteration
+
+    def propose(self, s):
+        return (s['a'] + s['b'])/2
+
+    def update(self, s, m, r):
+        below = r < 0
+        s['a'], s['b'] = np.where(below, m, s['a']), np.where(below, s['b'], m)
+
+class RegulaFalsi(Bisection):
+    endpoints = True
+
+    def propose(self, s): # the root of the chord
+        a, b, ra, rb = s['a'], s['b'], s['ra'], s['rb']
+        return a - ra*(b - a)/np.where(rb != ra, rb - ra, np.inf)
+
+    def update(self, s, m, r):
+        super().update(s, m, r)
+        below = r < 0
+        s['ra'], s['rb'] = np.where(below, r, s['ra']), np.where(below, s['rb'], r)
+
+class ImprovedBisection(RegulaFalsi): # target/hit-x-linear.py: halve the bracket until both of its ends are known, then follow the chord
+    endpoints = False
+
+    def propose(self, s):
+        s.setdefault('ra', np.full(len(s['a']), np.nan))
+        s.setdefault('rb', np.full(len(s['a']), np.nan))
+        known = np.isfinite(s['ra']) & np.isfinite(s['rb'])
+        return np.where(known, super().propose(s), Bisection.propose(self, s))
+
+class Illinois(RegulaFalsi): # regula falsi, but the residual of an end kept twice in a row is halved, no more stagnation
+    def update(self, s, m, r):
+        side = s.get('side', np.zeros(len(m)))
+        below = r < 0
+        s['rb'] = np.where(below & (side < 0), s['rb']/2, s['rb'])
+        s['ra'] = np.where(~below & (side > 0), s['ra']/2, s['ra'])
+        super().update(s, m, r)
+        s['side'] = np.where(below, -1., 1.)
+
+class Secant(RegulaFalsi): # the two last points, no bracket: fast, but may diverge
+    def update(self, s, m, r):
+        s['a'], s['ra'], s['b'], s['rb'] = s['b'], s['rb'], m, r
+
+class Brent(Bisection): # inverse quadratic interpolation, secant steps and bisection, as in scipy's brentq
+    endpoints = True
+
+    def __init__(self, xtol=1e-12, rtol=4*np.finfo(float).eps):
+        self.xtol, self.rtol = xtol, rtol
+
+    def propose(self, s):
+        if 'xcur' not in s: # b is the current estimate, the previous one is a, the other end of the bracket is xblk
+            s['xpre'], s['fpre'], s['xcur'], s['fcur'] = s['a'], s['ra'], s['b'], s['rb']
+            s['xblk'], s['fblk'], s['spre'], s['scur'] = np.zeros_like(s['a']), np.zeros_like(s['a']), np.zeros_like(s['a']), np.zeros_like(s['a'])
+        xpre, fpre, xcur, fcur, xblk, fblk, spre, scur = [ s[k] for k in ['xpre', 'fpre', 'xcur', 'fcur', 'xblk', 'fblk', 'spre', 'scur'] ]
+        change = fpre*fcur < 0 # the sign changed: the previous point becomes the other end of the bracket
+        xblk, fblk = np.where(change, xpre, xblk), np.where(change, fpre, fblk)
+        spre, scur = np.where(change, xcur - xpre, spre), np.where(change, xcur - xpre, scur)
+        swap = np.abs(fblk) < np.abs(fcur) # the current estimate is the best point
+        xpre, fpre = np.where(swap, xcur, xpre), np.where(swap, fcur, fpre)
+        xcur, fcur = np.where(swap, xblk, xcur), np.where(swap, fblk, fcur)
+        xblk, fblk = np.where(swap, xpre, xblk), np.where(swap, fpre, fblk)
+        delta = (self.xtol + self.rtol*np.abs(xcur))/2
+        sbis = (xblk - xcur)/2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dpre, dblk = (fpre - fcur)/(xpre - xcur), (fblk - fcur)/(xblk - xcur)
+            stry = np.where(xpre == xblk, -fcur*(xcur - xpre)/(fcur - fpre),             # secant
+                            -fcur*(fblk*dblk - fpre*dpre)/(dblk*dpre*(fblk - fpre)))    # inverse quadratic
+        interpolate = (np.abs(spre) > delta) & (np.abs(fcur) < np.abs(fpre))
+        accept = interpolate & (2*np.abs(stry) < np.minimum(np.abs(spre), 3*np.abs(sbis) - delta))
+        spre, scur = np.where(accept, scur, sbis), np.where(accept, stry, sbis)
+        s['xpre'], s['fpre'], s['xblk'], s['fblk'], s['spre'], s['scur'] = xcur, fcur, xblk, fblk, spre, scur
+        s['xcur'] = xcur + np.where(np.abs(scur) > delta, scur, np.where(sbis > 0, delta, -delta))
+        return s['xcur']
+
+    def update(self, s, m, r):
+        s['fcur'] = r
+
+methods = {'bisection': Bisection(), 'regula falsi': RegulaFalsi(), 'improved bisection': ImprovedBisection(),
+           'secant': Secant(), 'illinois': Illinois(), 'brent': Brent()}
+
+def solve(f, target, a, b, method=methods['brent'], tol=1e-3, maxiter=100, history=False):
+    # returns the last points launched (N,), their residuals f - target (N,) and the bananas spent on every target (N,),
+    # the bracket ends included; with history=True, the (iterations, N) residuals too, nans once a target is hit
+    target, a, b = [ np.array(v, dtype=float).ravel() for v in np.broadcast_arrays(target, a, b) ]
+    n = len(target)
+    x, residual, bananas = np.copy(b), np.full(n, np.inf), np.zeros(n, dtype=int)
+    s = {'a': a, 'b': b}
+    if method.endpoints: # the bracket ends shared by several targets are launched once
+        ends, inverse = np.unique(np.concatenate((a, b)), return_inverse=True)
+        values = np.asarray(f(ends), dtype=float)[inverse.ravel()]
+        s['ra'], s['rb'] = values[:n] - target, values[n:] - target
+        bananas += 2
+    active, residuals = np.arange(n), []
+    for _ in range(maxiter):
+        if not len(active): break
+        sub = { k: v[active] for k, v in s.items() }
+        m = method.propose(sub)
+        r = np.asarray(f(m), dtype=float) - target[active] # one batched launch for all the targets still searching
+        method.update(sub, m, r)
+        x[active], residual[active], bananas[active] = m, r, bananas[active] + 1
+        if history:
+            residuals.append(np.full(n, np.nan))
+            residuals[-1][active] = r
+        for k, v in sub.items(): # the state keys created by the method are allocated on the fly
+            if k not in s: s[k] = np.zeros(n)
+            s[k][active] = v
+        active = active[np.abs(r) >= tol]
+    return (x, residual, bananas, np.array(residuals)) if history else (x, residual, bananas)
+
+def brentq(f, a, b, xtol=1e-12, rtol=4*np.finfo(float).eps, maxiter=100): # one root at a time, line by line scipy's brentq: the iterates for Brent to match
+    xpre, xcur, xblk, fblk, spre, scur = a, b, 0., 0., 0., 0.
+    fpre, fcur = f(xpre), f(xcur)
+    iterates = []
+    for _ in range(maxiter):
+        if fpre*fcur < 0:
+            xblk, fblk = xpre, fpre
+            spre = scur = xcur - xpre
+        if abs(fblk) < abs(fcur):
+            xpre, xcur, xblk = xcur, xblk, xcur
+            fpre, fcur, fblk = fcur, fblk, fcur
+        delta = (xtol + rtol*abs(xcur))/2
+        sbis = (xblk - xcur)/2
+        if fcur == 0 or abs(sbis) < delta: break
+        if abs(spre) > delta and abs(fcur) < abs(fpre):
+            if xpre == xblk:
+                stry = -fcur*(xcur - xpre)/(fcur - fpre)
+            else:
+                dpre, dblk = (fpre - fcur)/(xpre - xcur), (fblk - fcur)/(xblk - xcur)
+                stry = -fcur*(fblk*dblk - fpre*dpre)/(dblk*dpre*(fblk - fpre))
+            if 2*abs(stry) < min(abs(spre), 3*abs(sbis) - delta):
+                spre, scur = scur, stry
+            else:
+                spre, scur = sbis, sbis
+        else:
+            spre, scur = sbis, sbis
+        xpre, fpre = xcur, fcur
+        xcur += scur if abs(scur) > delta else (delta if sbis > 0 else -delta)
+        fcur = f(xcur)
+        iterates.append(xcur)
+    return iterates
+
+if __name__ == '__main__': # target/convergence-x-*.py, 128 random targets, the launch speed at 60 degrees, with quadratic drag
+    import time, random
+    import backend
+    random.seed(1)
+    model, targets = backend.Model(k=.01), np.array([ random.uniform(1, 30) for _ in range(128) ])
+    p = lambda x: (x - 1)**5 + 1e-3*(x - 1) # Brent against the reference sequence, on a root where interpolation is poor
+    reference, probes = brentq(p, -2., 9.), []
+    def probe(x): # the first call is the bracket ends
+        probes.append(x[0])
+        return p(x)
+    x, r, bananas = solve(probe, 0, -2, 9, methods['brent'], tol=0, maxiter=len(reference))
+    print("brent: %d bananas, the same iterates as brentq: %s" % (bananas[0], np.array_equal(probes[1:], reference)))
+    launches = []
+    def f(v0): # impact abscissae, the batched calls are counted
+        launches.append(len(v0))
+        return backend.impact(v0, 60, model)[0]
+    for name, method in methods.items():
+        start, launches[:] = time.time(), []
+        x, r, bananas = solve(f, targets, 0, 35, method)
+        print("%-18s %4.1f bananas per target, %2d at most, %2d batched launches in %.2fs, max miss %.1e m" %
+              (name, bananas.mean(), bananas.max(), len(launches), time.time() - start, np.abs(r).max()))
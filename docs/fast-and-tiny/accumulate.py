@@ -0,0 +1,86 @@
+import os, time
+from functools import partial
+import numpy as np
+import framebuffer
+from numpy.lib.format import open_memmap
+from scene import Scene, tiny7
+import tiles, packet, sampler
+
+# resumable renders: the image is accumulated pass after pass in memory-mapped float32 files, outside of the Python heap,
+# and a render restarted with the same files skips every tile of every pass already done. Passes and tiles have their own
+# random streams, so a resumed render is exactly the same as an uninterrupted one (with the same number of samples per pass).
+# Crash consistency: there are two sum buffers, pass p of a tile reads the sums of buffer p%2 and overwrites buffer (p+1)%2,
+# so that a tile interrupted midway (Ctrl-C, a killed worker) is simply done again from the same data. The sample count per pixel
+# is the commit record, along with the parameters of the render (a resume with other tiles, samples or seed is refused):
+# it is kept by the main process for the tiles reported done, and written to disk (aside, then renamed)
+# only after the sum buffers are synced, at the end of every pass and every `every` seconds. A tile never gets two passes ahead
+# of the count on disk, so that after a power loss the render resumes from the last count written, with the sums it refers to.
+
+def buffers(filename, width, height, tile, samples, seed): # the two sum buffers and the count, created empty or reopened as they are
+    shape, params = (height, width, 3), np.array([width, height, tile, samples, seed])
+    names = [ filename + '.sum%d.npy' % b for b in range(2) ]
+    if all(os.path.exists(f) for f in names + [filename + '.count.npz']):
+        with np.load(filename + '.count.npz') as record:
+            count, stored = record['count'], record['params']
+        if not np.array_equal(stored, params): # the tiles, the passes and the random streams would not match the sums
+            raise ValueError("%s was started with width, height, tile, samples, seed = %s, not %s; remove its files to start over"
+                             % (filename, tuple(stored.tolist()), tuple(params.tolist())))
+        return [ open_memmap(f, 'r+') for f in names ], count
+    return [ open_memmap(f, 'w+', np.float32, shape) for f in names ], np.zeros(shape[:2], dtype=np.uint32)
+
+def checkpoint(filename, sums, count, params): # the sums reach the disk before the count that refers to them
+    for s in sums: s.flush()
+    with open(filename + '.count.npz.tmp', 'wb') as f:
+        np.savez(f, count=count, params=np.array(params))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(filename + '.count.npz.tmp', filename + '.count.npz')
+
+worker = {} # per-process state, as in tiles.py
+
+def attach(shade, filename, width, height, samples, seed):
+    worker['sums'] = [ open_memmap(filename + '.sum%d.npy' % b, 'r+') for b in range(2) ]
+    worker['shade'], worker['samples'], worker['seed'] = shade, samples, seed
+
+def accumulate_tile(job):
+    index, npass, (i0, i1, j0, j1) = job
+    rng = np.random.default_rng([worker['seed'], npass, index])
+    np.random.seed([worker['seed'], npass, index])
+    i, j = np.meshgrid(np.arange(i0, i1), np.arange(j0, j1), indexing='ij')
+    color = worker['shade'](i.ravel(), j.ravel(), rng).reshape(i1-i0, j1-j0, 3)
+    source, target = worker['sums'][npass % 2], worker['sums'][(npass + 1) % 2]
+    target[i0:i1, j0:j1] = source[i0:i1, j0:j1] + color*worker['samples'] # an assignment: doing the tile twice changes nothing
+    return index, npass
+
+def render(shade, filename, width, height, passes, samples=1, tile=32, workers=None, seed=0, every=60, progress=tiles.print_progress):
+    # shade(i, j, rng) returns the mean of samples samples for the pixels (i[k], j[k]), see tiles.render; passes times over the image
+    params = (width, height, tile, samples, seed)
+    sums, count = buffers(filename, *params)
+    split = tiles.split(width, height, tile)
+    jobs = [ [ (index, p, t) for index, t in enumerate(split) if count[t[0], t[2]] < (p+1)*samples ] for p in range(passes) ] # not done yet
+    start, flushed, args = time.time(), time.time(), (shade, filename, width, height, samples, seed)
+    done, todo = 0, sum(map(len, jobs))
+    pool = tiles.Workers(workers, attach, args)
+    try:
+        for p in range(passes): # one pass at a time: a tile is never two passes ahead of the last checkpoint
+            for index, npass in pool.map(accumulate_tile, jobs[p]):
+                i0, i1, j0, j1 = split[index]
+                count[i0:i1, j0:j1] = (npass + 1)*samples # the tile is done, in the main process only
+                if time.time() - flushed > every:
+                    checkpoint(filename, sums, count, params)
+                    flushed = time.time()
+                done += 1
+                if progress: progress({'done': done, 'total': todo, 'tile': split[index], 'elapsed': time.time() - start})
+            checkpoint(filename, sums, count, params)
+    finally:
+        pool.close() # the tiles cut short are not counted, they are done again on resume
+        worker.clear()
+        checkpoint(filename, sums, count, params)
+    parity = (count // max(samples, 1)) % 2
+    return np.where(parity[...,None] == 0, sums[0], sums[1]) / np.maximum(count, 1)[...,None]
+
+if __name__ == '__main__': # interrupt it and run it again: it resumes where it stopped
+    scene, nrays = Scene(tiny7), 2
+    shade = partial(packet.shade, scene, packet.camera, packet.width, packet.height, nrays, packet.maxdepth, None, True, sampler.WhiteNoise())
+    image = render(shade, 'result7-accumulate', packet.width, packet.height, passes=32, samples=nrays)
+    framebuffer.save('result7-accumulate.png', image)
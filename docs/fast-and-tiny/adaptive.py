@@ -0,0 +1,40 @@
+import numpy as np
+import framebuffer
+from scene import Scene, tiny7
+import packet, sampler
+
+# adaptive sampling: every pass shoots a few more rays, but only through the pixels that have not converged yet;
+# running mean and variance are tracked per pixel (Welford), a pixel is done when the standard error of its mean is below the threshold
+
+def progressive(scene, camera, width, height, threshold=.03, batch=2, minimum=4, budget=64, maxdepth=3, roulette=None, sampler=sampler.WhiteNoise(), nee=False, seed=0, chunk=2**16):
+    rng = np.random.default_rng(seed)
+    rays = camera.directions(width, height).reshape(-1, 3)
+    mean, m2 = np.zeros((height*width, 3)), np.zeros((height*width, 3)) # running mean and sum of squared deviations
+    count = np.zeros(height*width, dtype=int)
+    background = np.isinf(packet.scene_intersect(scene, np.tile(camera.position, (len(rays), 1)), rays)[0]) # the primary ray escapes, one sample is exact
+    mean[background], count[background] = packet.ambient_color, 1
+    active = np.flatnonzero(~background)                                 # the pixels that still need rays
+    while len(active):
+        for a in np.array_split(active, max(1, len(active)*batch//chunk)): # bounded packet size
+            ray = np.repeat(rays[a], batch, axis=0)
+            samples = sampler.packet(np.repeat(a, batch), (count[a,None] + np.arange(batch)).ravel(), rng) # the sample indices continue from pass to pass
+            color = packet.trace(scene, np.tile(camera.position, (len(ray), 1)), ray, samples, maxdepth, roulette, nee).reshape(-1, batch, 3)
+            for s in range(batch): # Welford update, one sample at a time, all the pixels at once
+                count[a] += 1
+                delta = color[:,s] - mean[a]
+                mean[a] += delta/count[a,None]
+                m2[a] += delta*(color[:,s] - mean[a])
+        error = np.sqrt(m2[active]/np.maximum(count[active,None]-1, 1)/count[active,None]).max(axis=1) # standard error of the mean, worst channel
+        error[count[active] < 2] = np.inf # unknown after a single sample
+        noisy = (error > threshold) | (count[active] < minimum) # a few samples are needed to trust the estimate
+        active = active[noisy & (count[active] < budget)]
+        yield mean.reshape(height, width, 3).copy(), count.reshape(height, width).copy() # a usable image after each pass, kept as is by the next ones
+
+def render(scene, camera, width, height, **kwargs):
+    for image, count in progressive(scene, camera, width, height, **kwargs): pass
+    return image, count
+
+if __name__ == '__main__':
+    for n, (image, count) in enumerate(progressive(Scene(tiny7), packet.camera, packet.width, packet.height)):
+        print("pass %d: %.2f rays per pixel" % (n + 1, count.mean()))
+    framebuffer.save('result7-adaptive.png', image)
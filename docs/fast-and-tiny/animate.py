@@ -0,0 +1,59 @@
+import subprocess
+from functools import partial
+import numpy as np
+import framebuffer
+from scene import Scene, tiny7
+from camera import Camera
+from bvh import BVH
+import packet, tiles, sampler
+
+# animation: frames are rendered one at a time and streamed to disk (or to an encoder) as soon as they are ready,
+# never more than one frame in memory; scene and camera are either fixed or functions of time.
+# One pool of workers renders the whole sequence: the compiled scene and its BVH are sent to the workers once,
+# when the pool starts, and only the camera travels with the tiles; the pool is restarted only when the scene changes.
+
+def frame(scene, i, j, rng, camera, width, height, nrays, maxdepth, roulette, jitter, sampler, nee): # packet.shade, the scene bound first
+    return packet.shade(scene, camera, width, height, nrays, maxdepth, roulette, jitter, sampler, i, j, rng, nee=nee)
+
+def frames(scene, camera, times, width, height, nrays, bvh=False, maxdepth=3, roulette=None, jitter=False, sampler=sampler.WhiteNoise(), nee=False,
+           tile=32, seed=0, workers=None, progress=tiles.print_progress): # generator of images, the same as packet.render for every frame
+    session, last = None, None
+    try:
+        for t in times:
+            description = scene(t) if callable(scene) else scene
+            if description is not last: # the compiled scene and its BVH are reused for as long as only the camera moves
+                compiled = description if isinstance(description, Scene) else Scene(description)
+                if bvh and compiled.bvh is None:
+                    compiled.bvh = BVH(compiled)
+                if session: session.close()
+                session = tiles.Session(partial(frame, compiled), width, height, tile, workers)
+                last = description
+            yield session.render(seed, progress, camera=camera(t) if callable(camera) else camera, width=width, height=height, nrays=nrays,
+                                 maxdepth=maxdepth, roulette=roulette, jitter=jitter, sampler=sampler, nee=nee)
+    finally:
+        if session: session.close()
+
+def write_png(images, pattern='frame%04d.png'): # PNG sequence
+    for n, image in enumerate(images):
+        framebuffer.save(pattern % n, image)
+
+def write_pipe(images, command): # raw rgb24 frames piped to an encoder, e.g. ffmpeg(...) below
+    encoder = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        for image in images:
+            encoder.stdin.write(framebuffer.rgb24(image).tobytes())
+    finally:
+        encoder.stdin.close()
+        encoder.wait()
+
+def ffmpeg(width, height, filename, fps=25):
+    return ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '%dx%d' % (width, height), '-r', str(fps),
+            '-i', '-', '-pix_fmt', 'yuv420p', filename]
+
+def turntable(center, radius, elevation=-2.): # a camera orbiting around the center, one revolution for t from 0 to 1
+    return lambda t: Camera(position=np.array(center) + (radius*np.sin(2*np.pi*t), elevation, -radius*np.cos(2*np.pi*t)), lookat=center)
+
+if __name__ == '__main__':
+    width, height, nframes = 320, 240, 36
+    images = frames(tiny7, turntable((5, 0, 10), 14), np.arange(nframes)/nframes, width, height, nrays=10, progress=None)
+    write_png(images, 'turntable%03d.png') # or write_pipe(images, ffmpeg(width, height, 'turntable.mp4'))
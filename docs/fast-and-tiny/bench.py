@@ -0,0 +1,92 @@
+import os, re, sys, json, time, argparse, resource, tempfile, subprocess, contextlib
+
+# benchmark of the stages tiny0.py .. tiny7.py and of the accelerated tracers (packet.py, with and without the BVH) on the scene of tiny7:
+# every stage runs headless in its own process, at the resolution and the sample count asked, in a temporary directory
+# (the result*.png files of the repository are never touched); wall time, primary rays per second and peak memory are recorded,
+# and compared to a saved baseline: the benchmark fails if the throughput of a stage drops more than the tolerance.
+# tiny0.py and tiny1.py do not trace anything, their "rays" are the pixels.
+
+folder = os.path.dirname(os.path.abspath(__file__))
+scalar = ['tiny%d' % n for n in range(8)]
+accelerated = ['packet', 'packet-bvh']
+
+def run_script(name, width, height, spp, workers): # a tiny*.py script with the resolution and the sample count patched
+    with open(os.path.join(folder, name + '.py')) as f:
+        source = f.read()
+    source = re.sub(r'^width, height(.*)= 640, 480', r'width, height\g<1>= %d, %d' % (width, height), source, flags=re.M)
+    source = re.sub(r'^nrays, maxdepth = \d+', 'nrays, maxdepth = %d' % spp, source, flags=re.M)
+    source = source.replace('render(shade, width, height)', 'render(shade, width, height, workers=%r)' % workers)
+    with open(name + '.py', 'w') as f: # in the temporary directory, along with the images it saves
+        f.write(source)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [folder, os.environ.get('PYTHONPATH')])))
+    # run as a script of its own, not through runpy: under spawn, the workers re-import __main__ from this file
+    subprocess.run([sys.executable, name + '.py'], env=env, stdout=subprocess.DEVNULL, check=True)
+    return width*height*(spp if name == 'tiny7' else 1)
+
+def run_packet(name, width, height, spp, workers):
+    from scene import Scene, tiny7
+    from bvh import BVH
+    import packet
+    scene = Scene(tiny7)
+    if name == 'packet-bvh':
+        scene.bvh = BVH(scene)
+    packet.render(scene, packet.camera, width, height, spp, workers=workers, progress=None)
+    return width*height*spp
+
+def child(name, width, height, spp, workers): # runs in its own process, prints one json line
+    sys.path.insert(0, folder)
+    with tempfile.TemporaryDirectory(prefix='bench-') as tmp, open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+        os.chdir(tmp)                                          # the scripts report their progress and save their images, let them
+        start = time.perf_counter()
+        rays = (run_packet if name in accelerated else run_script)(name, width, height, spp, workers)
+        wall = time.perf_counter() - start
+        os.chdir(folder)
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(json.dumps({'stage': name, 'wall': wall, 'rays': rays, 'rays/s': rays/wall, 'peak MiB': peak/1024}))
+
+def run(name, width, height, spp, workers):
+    out = subprocess.run([sys.executable, __file__, '--child', name, '--width', str(width), '--height', str(height),
+                          '--spp', str(spp), '--workers', str(workers)], check=True, capture_output=True, text=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark of the fast-and-tiny stages')
+    parser.add_argument('stages', nargs='*', default=scalar + accelerated)
+    parser.add_argument('--width', type=int, default=64)
+    parser.add_argument('--height', type=int, default=48)
+    parser.add_argument('--spp', type=int, default=4, help='samples per pixel of tiny7 and of the packet tracers')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--baseline', default=os.path.join(folder, 'bench.json'))
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=.2, help='allowed relative drop of rays/s')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.width, args.height, args.spp, args.workers)
+        sys.exit()
+
+    key = '%dx%dx%d/%d' % (args.width, args.height, args.spp, args.workers) # the baselines are per configuration
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results, failed = {}, []
+    print("%-11s %10s %12s %10s %10s" % ("stage", "wall, s", "rays/s", "peak, MiB", "vs base"))
+    for name in args.stages:
+        r = results[name] = run(name, args.width, args.height, args.spp, args.workers)
+        base = baseline.get(key, {}).get(name)
+        ratio = r['rays/s']/base['rays/s'] if base else None
+        if ratio is not None and ratio < 1 - args.tolerance:
+            failed.append(name)
+        print("%-11s %10.3f %12.0f %10.1f %10s" % (name, r['wall'], r['rays/s'], r['peak MiB'], '-' if ratio is None else '%.2fx' % ratio))
+    if 'tiny7' in results:
+        for name in accelerated:
+            if name in results:
+                print("%s is %.1fx faster than tiny7" % (name, results[name]['rays/s']/results['tiny7']['rays/s']))
+    if args.save:
+        baseline[key] = {**baseline.get(key, {}), **results}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1)
+    if failed:
+        print("throughput regression beyond %d%%: %s" % (args.tolerance*100, ', '.join(failed)))
+        sys.exit(1)
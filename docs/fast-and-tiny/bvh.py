@@ -0,0 +1,132 @@
+import time
+import numpy as np
+from scene import Scene
+from packet import intersect, surface, scene_intersect
+
+# bounding volume hierarchy over the spheres, boxes and triangles of a compiled scene (see scene.py):
+# binned SAH build, and the traversal is made by whole ray packets, each node splitting the packet into the rays that hit its box
+
+def bounds(scene): # axis-aligned bounding box of every primitive, spheres, boxes, triangles and instances, as in the primitive numbering of the scene
+    corners = np.stack((scene.v0, scene.v0 + scene.e1, scene.v0 + scene.e2))
+    record = scene.shapes[scene.instances[:,0].astype(int)]
+    sphere = record[:,:1] == 0
+    lo = np.where(sphere, record[:,1:4] - record[:,4:5], record[:,1:4]) # object space box of the geometry of every instance,
+    hi = np.where(sphere, record[:,1:4] + record[:,4:5], record[:,4:7]) # its 8 corners are brought to the world
+    box = np.stack([ np.where([x, y, z], hi, lo) for x in (0, 1) for y in (0, 1) for z in (0, 1) ])
+    box = np.einsum('jkl,ijl->ijk', scene.transform[:,:3,:3], box) + scene.transform[:,:3,3]
+    return np.vstack((scene.center - scene.radius[:,None], scene.bmin, corners.min(axis=0), box.min(axis=0))), \
+           np.vstack((scene.center + scene.radius[:,None], scene.bmax, corners.max(axis=0), box.max(axis=0)))
+
+def half_area(lo, hi):
+    e = np.maximum(hi - lo, 0)
+    return e[...,0]*e[...,1] + e[...,1]*e[...,2] + e[...,2]*e[...,0]
+
+class BVH:
+    def __init__(self, scene, leaf_size=16, nbins=16): # leaves are intersected in a vectorized way, they can be large
+        plo, phi = bounds(scene)
+        self.prims = np.arange(len(plo)) # primitives reordered so that every node owns a contiguous range of them
+        self.lo, self.hi, self.child, self.start, self.count, self.axis = [], [], [], [], [], []
+        self.build(plo, phi, (plo + phi)/2, 0, len(plo), leaf_size, nbins)
+        pad = 1e-9*(1 + np.abs(self.lo) + np.abs(self.hi)) # slightly inflated node boxes, we do not want to lose hits on their walls
+        self.lo, self.hi = np.array(self.lo) - pad, np.array(self.hi) + pad
+
+    def build(self, plo, phi, centroid, start, end, leaf_size, nbins):
+        node, idx = len(self.lo), self.prims[start:end]
+        self.lo.append(plo[idx].min(axis=0))
+        self.hi.append(phi[idx].max(axis=0))
+        self.child.append(-1) # the left child is always node+1, the right one is stored here, -1 for leaves
+        self.start.append(start)
+        self.count.append(end - start)
+        self.axis.append(0)
+        if end - start <= leaf_size: return
+        c = centroid[idx]
+        cmin, cmax = c.min(axis=0), c.max(axis=0)
+        best, left = np.inf, None
+        for axis in range(3):
+            if cmax[axis] - cmin[axis] < 1e-12: continue # all the centroids are in the same bin
+            b = np.minimum(((c[:,axis] - cmin[axis])/(cmax[axis] - cmin[axis])*nbins).astype(int), nbins-1)
+            blo, bhi = np.full((nbins, 3), np.inf), np.full((nbins, 3), -np.inf)
+            np.minimum.at(blo, b, plo[idx])
+            np.maximum.at(bhi, b, phi[idx])
+            nl = np.cumsum(np.bincount(b, minlength=nbins))[:-1] # split after bin s: bins [0..s] go to the left, the rest to the right
+            nr = end - start - nl
+            cost = half_area(np.minimum.accumulate(blo)[:-1], np.maximum.accumulate(bhi)[:-1])*nl + \
+                   half_area(np.minimum.accumulate(blo[::-1])[::-1][1:], np.maximum.accumulate(bhi[::-1])[::-1][1:])*nr
+            cost[(nl==0) | (nr==0)] = np.inf
+            s = np.argmin(cost)
+            if cost[s] < best:
+                best, left, self.axis[node] = cost[s], b <= s, axis
+        if left is None: return      # no way to split, make a leaf
+        self.prims[start:end] = np.hstack((idx[left], idx[~left]))
+        self.count[node] = 0
+        self.build(plo, phi, centroid, start, start + np.count_nonzero(left), leaf_size, nbins)
+        self.child[node] = len(self.lo)
+        self.build(plo, phi, centroid, start + np.count_nonzero(left), end, leaf_size, nbins)
+
+    def intersect(self, scene, ray_origin, ray_direction):
+        n = len(ray_direction)
+        nearest, k, axis = np.full(n, np.inf), np.zeros(n, dtype=int), np.full(n, -1)
+        with np.errstate(divide='ignore'):
+            inv = 1/ray_direction
+        stack = [(0, np.arange(n))] # node and the rays of the packet that may hit it
+        while stack:
+            node, rays = stack.pop()
+            with np.errstate(invalid='ignore'):        # slab test, nans (0*inf) are ignored by fmin/fmax
+                t0 = (self.lo[node] - ray_origin[rays])*inv[rays]
+                t1 = (self.hi[node] - ray_origin[rays])*inv[rays]
+            tnear, tfar = np.fmax.reduce(np.fmin(t0, t1), axis=1), np.fmin.reduce(np.fmax(t0, t1), axis=1)
+            rays = rays[(tnear <= tfar) & (tfar >= 0) & (tnear <= nearest[rays])] # do not visit nodes behind the nearest hit so far
+            if not len(rays): continue
+            if self.child[node] >= 0:
+                near, far = node+1, self.child[node]
+                if ray_direction[rays[0], self.axis[node]] < 0: # front-to-back order (for the first ray of the packet)
+                    near, far = far, near
+                stack.append((far, rays))
+                stack.append((near, rays))
+                continue
+            prims, dist, ax = intersect(scene, self.prims[self.start[node]:self.start[node]+self.count[node]], ray_origin[rays], ray_direction[rays])
+            j = np.argmin(dist, axis=1)
+            dj = dist[np.arange(len(rays)), j]
+            closer = dj < nearest[rays]
+            r, j = rays[closer], j[closer]
+            nearest[r], k[r], axis[r] = dj[closer], prims[j], ax[closer, j]
+        return surface(scene, ray_origin, ray_direction, nearest, k, axis)
+
+def random_scene(n, rng): # n spheres and boxes scattered in a 100^3 cube
+    size = 100/n**(1/3)/2
+    center = rng.uniform(0, 100, size=(n, 3))
+    return Scene([ {'center': c, 'radius': size*rng.uniform(.2, .5), 'color': rng.uniform(size=3), 'hot': False} if i%2 else
+                   {'min': c - size*rng.uniform(.2, .5, size=3), 'max': c + size*rng.uniform(.2, .5, size=3), 'color': rng.uniform(size=3), 'hot': False}
+                   for i,c in enumerate(center) ])
+
+def linear_scan(scene, ray_origin, ray_direction, chunk=2**21): # the same as scene_intersect, but in chunks of rays to bound the memory
+    step = max(1, chunk//scene.nprimitives)
+    hits = [ scene_intersect(scene, ray_origin[i:i+step], ray_direction[i:i+step]) for i in range(0, len(ray_direction), step) ]
+    return [ np.concatenate(h) for h in zip(*hits) ]
+
+if __name__ == '__main__': # per-ray cost against the primitive count
+    rng = np.random.default_rng(0)
+    nrays = 4096
+    print("%8s %14s %14s %10s %8s" % ("prims", "linear, us/ray", "bvh, us/ray", "build, s", "same"))
+    for n in [5, 50, 500, 5000, 50000, 100000]:
+        scene = random_scene(n, rng)
+        eye = np.array([50., 50., -100.])
+        ray_origin = np.tile(eye, (nrays, 1))
+        ray_direction = rng.uniform(0, 100, size=(nrays, 3)) - eye
+        ray_direction /= np.linalg.norm(ray_direction, axis=1, keepdims=True)
+
+        linear, same = np.nan, '-'
+        if n <= 5000:
+            t = time.time()
+            ref = linear_scan(scene, ray_origin, ray_direction)
+            linear = (time.time() - t)/nrays*1e6
+
+        t = time.time()
+        scene.bvh = BVH(scene)
+        build = time.time() - t
+        t = time.time()
+        hit = scene_intersect(scene, ray_origin, ray_direction)
+        accelerated = (time.time() - t)/nrays*1e6
+        if n <= 5000:
+            same = np.array_equal(ref[0], hit[0]) and all(np.allclose(a, b) for a,b in zip(ref[1:], hit[1:]))
+        print("%8d %14.2f %14.2f %10.2f %8s" % (n, linear, accelerated, build, same))
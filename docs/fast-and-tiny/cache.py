@@ -0,0 +1,89 @@
+import os, re, sys, hashlib, inspect, subprocess
+import numpy as np
+import framebuffer
+from scene import Scene, tiny7
+import scene as scenes, camera as cameras, mesh, sampler, tiles, packet
+
+# on-disk render cache: a render is keyed by the compiled scene, the camera, the sampling parameters and the source code of the tracer,
+# and the cache keeps the float accumulation buffer (the sum of the samples and their number) rather than the image,
+# so that asking for more samples only traces the missing ones. The tiny*.py scripts are skipped when neither they nor the modules they import changed.
+
+directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.render-cache')
+tracer = [scenes, cameras, mesh, sampler, tiles, packet] # any change in these files invalidates the cache
+volatile = ['workers', 'progress']                      # options that do not change the image
+
+def digest(h, item): # feed anything made of arrays, numbers, strings, lists, dicts and plain objects to the hash h
+    if isinstance(item, np.ndarray):
+        h.update(str((item.dtype, item.shape)).encode())
+        h.update(np.ascontiguousarray(item).tobytes())
+    elif isinstance(item, (list, tuple)):
+        h.update(b'[')
+        for x in item: digest(h, x)
+        h.update(b']')
+    elif isinstance(item, dict):
+        for k in sorted(item): digest(h, (k, item[k]))
+    elif hasattr(item, '__dict__'):
+        digest(h, (type(item).__name__, vars(item)))
+    else:
+        h.update(repr(item).encode())
+    return h
+
+def version():
+    return digest(hashlib.sha1(), [ inspect.getsource(m) for m in tracer ]).hexdigest()
+
+def key(scene, camera, width, height, **options): # the number of samples is not a part of the key
+    geometry = [scene.spheres, scene.boxes, scene.vertices, scene.triangles, scene.meshes, scene.shapes, scene.instances, scene.transform,
+                scene.materials, scene.material] # not the BVH
+    view = [camera.position, camera.azimuth, camera.fov, camera.lookat]
+    options = { k: v for k,v in options.items() if k not in volatile }
+    return digest(hashlib.sha1(), [version(), geometry, view, width, height, options]).hexdigest()
+
+def render(scene, camera, width, height, nrays, seed=0, **options): # the same as packet.render, served from the cache when possible
+    filename = os.path.join(directory, key(scene, camera, width, height, seed=seed, **options) + '.npz')
+    total, count = np.zeros((height, width, 3)), 0
+    if os.path.exists(filename):
+        with np.load(filename) as cached:
+            total, count = cached['total'], int(cached['count'])
+    if count < nrays: # the missing samples are traced with their own random streams, their indices continue the sequence, and added to the buffer
+        batch = packet.render(scene, camera, width, height, nrays - count, seed=seed if count == 0 else int(sampler.hash32(seed, count)), first=count, **options)
+        total, count = total + batch*(nrays - count), nrays
+        os.makedirs(directory, exist_ok=True)
+        with open(filename + '.tmp', 'wb') as f: # written aside and renamed, an interrupted build never leaves a broken entry
+            np.savez(f, total=total, count=count)
+        os.replace(filename + '.tmp', filename)
+    return total/count # an entry with more samples than asked is served as is
+
+def dependencies(script): # the script and the local modules it imports, recursively
+    folder, todo, found = os.path.dirname(os.path.abspath(script)), [os.path.abspath(script)], []
+    while todo:
+        path = todo.pop()
+        if path in found or not os.path.exists(path): continue
+        found.append(path)
+        with open(path) as f:
+            for line in f:
+                m = re.match(r'\s*(?:from\s+(\w+)\s+import|import\s+([\w, ]+))', line)
+                if m: todo += [ os.path.join(folder, name.strip() + '.py') for name in (m.group(1) or m.group(2)).split(',') ]
+    return sorted(found)
+
+def build(script): # runs a tiny*.py script unless its results are up to date, returns True if it was run
+    with open(script) as f:
+        results = [ os.path.join(os.path.dirname(os.path.abspath(script)), r) for r in re.findall(r"save\('([^']+)'", f.read()) ]
+    h = hashlib.sha1()
+    for path in dependencies(script):
+        with open(path, 'rb') as f: h.update(f.read())
+    stamp = os.path.join(directory, os.path.basename(script) + '.sha1')
+    if os.path.exists(stamp) and all(os.path.exists(r) for r in results):
+        with open(stamp) as f:
+            if f.read() == h.hexdigest(): return False
+    subprocess.run([sys.executable, os.path.basename(script)], cwd=os.path.dirname(os.path.abspath(script)), check=True)
+    os.makedirs(directory, exist_ok=True)
+    with open(stamp, 'w') as f:
+        f.write(h.hexdigest())
+    return True
+
+if __name__ == '__main__': # python cache.py tiny0.py ... tiny7.py; without arguments, the packet tracer render of tiny7 through the cache
+    for script in sys.argv[1:]:
+        print("%s: %s" % (script, 'rendered' if build(script) else 'up to date'))
+    if len(sys.argv) == 1:
+        image = render(Scene(tiny7), packet.camera, packet.width, packet.height, packet.nrays, maxdepth=packet.maxdepth)
+        framebuffer.save('result7-packet.png', image)
@@ -0,0 +1,44 @@
+import numpy as np
+
+# pinhole camera; the image plane is sampled by a H x W x 3 buffer of ray directions, computed in one go
+# and kept as long as the camera does not move, so that animations and multi-sample jitter do not recompute any trigonometry
+
+class Camera:
+    def __init__(self, position=(0, 0, 0), azimuth=0., fov=2*np.arctan(320/500), lookat=None):
+        self.position = np.array(position, dtype=float)
+        self.azimuth  = azimuth # rotation around the Y axis, the camera looks along Z for azimuth 0
+        self.fov      = fov     # horizontal field of view, 640 pixels at the distance 500 by default, as in tiny*.py
+        self.lookat   = lookat  # if given, the camera looks at this point and the azimuth is ignored
+        self.key, self.frame, self.buffer, self.rays = None, None, None, None
+
+    def __getstate__(self): # the cached buffers are not shipped to the worker processes, they are cheap to recompute
+        return {**self.__dict__, 'key': None, 'frame': None, 'buffer': None, 'rays': None}
+
+    def basis(self): # right, down and forward unit vectors (the Y axis points down in our scenes)
+        if self.lookat is None:
+            c, s = np.cos(self.azimuth), np.sin(self.azimuth)
+            return np.array([c, 0, -s]), np.array([0., 1., 0.]), np.array([s, 0, c])
+        forward = np.array(self.lookat, dtype=float) - self.position
+        forward /= np.linalg.norm(forward)
+        right = np.cross(forward, [0., -1., 0.])
+        right /= np.linalg.norm(right)
+        return right, np.cross(forward, right), forward
+
+    def plane(self, width, height): # unnormalized directions through the pixels, cached until the camera or the resolution change
+        key = (width, height, self.fov, self.azimuth if self.lookat is None else (tuple(self.lookat), tuple(self.position))) # a translation keeps the buffer
+        if key != self.key:
+            self.frame = right, down, forward = self.basis()
+            j, i = np.meshgrid(np.arange(width) - width/2, np.arange(height) - height/2)
+            self.buffer = j[...,None]*right + i[...,None]*down + width/2/np.tan(self.fov/2)*forward
+            self.rays = self.buffer / np.linalg.norm(self.buffer, axis=-1, keepdims=True)
+            self.key = key
+        return self.buffer
+
+    def directions(self, width, height, i=slice(None), j=slice(None), offset=None):
+        # unit directions through the pixels (i,j); offset is an optional (n,2) array of sub-pixel shifts (along j and i)
+        plane = self.plane(width, height)
+        if offset is None:
+            return self.rays[i, j]
+        right, down, _ = self.frame
+        d = plane[i, j] + offset[:,:1]*right + offset[:,1:]*down
+        return d / np.linalg.norm(d, axis=-1, keepdims=True)
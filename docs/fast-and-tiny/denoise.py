@@ -0,0 +1,47 @@
+import time
+import numpy as np
+import framebuffer
+from scene import Scene, tiny7
+import packet
+
+# edge-aware a-trous wavelet filter (Dammertz et al. 2010): a 5x5 B3-spline kernel with holes growing as 2^iteration,
+# the weights of the neighbours are cut across the edges of the first-hit normal, albedo and depth buffers (see packet.guides)
+# and across large color differences. The albedo is divided out before filtering and multiplied back after,
+# so that only the lighting is blurred, never the colors of the objects.
+
+kernel = np.array([1/16, 1/4, 3/8, 1/4, 1/16])
+
+def shifted(image, di, dj): # image[i+di, j+dj], clamped to the border
+    h, w = image.shape[:2]
+    return image[np.clip(np.arange(h) + di, 0, h-1)][:, np.clip(np.arange(w) + dj, 0, w-1)]
+
+def atrous(image, normal, albedo, depth, iterations=3, sigma_color=1., sigma_normal=128, sigma_albedo=.1, sigma_depth=.1):
+    depth = np.where(np.isinf(depth), 1e9, depth)[...,None]
+    light = image / np.maximum(albedo, 1e-3) # demodulated: the lighting only
+    for it in range(iterations):
+        step = 2**it
+        total, weights = np.zeros_like(light), np.zeros(light.shape[:2] + (1,))
+        for a, di in zip(kernel, range(-2, 3)):
+            for b, dj in zip(kernel, range(-2, 3)):
+                q = lambda x: shifted(x, di*step, dj*step)
+                w = a*b*np.exp(-np.sum((q(light) - light)**2, axis=-1, keepdims=True)/sigma_color**2 \
+                               -np.sum((q(albedo) - albedo)**2, axis=-1, keepdims=True)/sigma_albedo**2 \
+                               -np.abs(q(depth) - depth)/(sigma_depth*depth + 1e-9)) \
+                    * np.maximum(np.sum(q(normal)*normal, axis=-1, keepdims=True), 0)**sigma_normal
+                w = np.where((di == 0) & (dj == 0), a*b, w) # the pixel itself always counts (e.g. the background, of zero normal)
+                total += w*q(light)
+                weights += w
+        light = total/weights
+        sigma_color /= 2 # finer and finer color differences are kept as the holes grow
+    return light*np.maximum(albedo, 1e-3)
+
+def render(scene, camera, width, height, nrays, **options): # packet.render followed by the filter
+    image = packet.render(scene, camera, width, height, nrays, **options)
+    return atrous(image, *packet.guides(scene, camera, width, height))
+
+if __name__ == '__main__': # 2 samples per pixel and the filter against the 10 samples of packet.py
+    scene = Scene(tiny7)
+    t = time.time()
+    image = render(scene, packet.camera, packet.width, packet.height, 2, progress=None)
+    print("2 spp + denoise: %.2fs" % (time.time() - t))
+    framebuffer.save('result7-denoise.png', image)
@@ -0,0 +1,40 @@
+import zlib, struct
+import numpy as np
+
+# the output path shared by the tiny*.py stages and the tools around them: frame buffers are H x W x 3 float arrays,
+# pixel coordinates come as whole grids, and the images are tone mapped, gamma corrected and written in one go,
+# PNG or PPM depending on the file extension, with no per-pixel Python code and no plotting library involved
+
+def allocate(width, height, channels=3):
+    return np.zeros((height, width, channels))
+
+def grid(width, height): # row and column of every pixel, two H x W integer arrays
+    return np.meshgrid(np.arange(height), np.arange(width), indexing='ij')
+
+def tonemap(image, exposure=1., operator='clip'): # 'clip' keeps [0,1] as is, 'reinhard' compresses [0,inf) into [0,1)
+    image = image*exposure
+    return np.clip(image, 0, 1) if operator == 'clip' else image/(1 + image)
+
+def rgb24(image, gamma=1.): # the images of the tiny*.py stages are stored linear, hence gamma 1 by default
+    image = np.clip(image, 0, 1)**(1/gamma)
+    if image.ndim == 2: image = np.repeat(image[...,None], 3, axis=2) # gray levels
+    return (image*255 + .5).astype(np.uint8)
+
+def write_ppm(filename, pixels): # binary PPM (P6) of a H x W x 3 uint8 array
+    with open(filename, 'wb') as f:
+        f.write(b'P6 %d %d 255\n' % (pixels.shape[1], pixels.shape[0]))
+        f.write(np.ascontiguousarray(pixels).tobytes())
+
+def write_png(filename, pixels): # 8-bit RGB PNG of a H x W x 3 uint8 array, every row with the filter byte 0 (none)
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = np.hstack((np.zeros((pixels.shape[0], 1), dtype=np.uint8), pixels.reshape(pixels.shape[0], -1)))
+    with open(filename, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', pixels.shape[1], pixels.shape[0], 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+def save(filename, image, exposure=1., operator='clip', gamma=1.): # float image to PNG or PPM
+    pixels = rgb24(tonemap(image, exposure, operator), gamma)
+    (write_ppm if filename.lower().endswith('.ppm') else write_png)(filename, pixels)
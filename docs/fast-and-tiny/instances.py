@@ -0,0 +1,26 @@
+import time
+import numpy as np
+import framebuffer
+from scene import Scene, tiny7, affine
+from bvh import BVH
+import packet
+
+# object instancing: one geometry record and a 4x4 transform per copy, the rays are brought into the object space of every instance,
+# so that the memory grows with the unique geometry only, and rotated (or sheared) boxes need no new intersection code
+
+cube = {'min': [-1, -1, -1], 'max': [1, 1, 1]} # the geometry records are given in their own object spaces
+ball = {'center': [0, 0, 0], 'radius': 1}
+
+def field(n, rng): # n x n copies of the cube and the ball, randomly rotated and squashed, lying on the floor of tiny7
+    return [ {'instance': cube if (i+j)%2 else ball, 'color': rng.uniform(.3, 1, size=3), 'hot': False,
+              'transform': affine((i*11/n + .3, 1.7, j*10/n + 6.3), rng.uniform(0, 2*np.pi, size=3), rng.uniform(.1, .25, size=3))}
+             for i in range(n) for j in range(n) ]
+
+if __name__ == '__main__':
+    scene = Scene(tiny7[2:3] + tiny7[4:] + field(20, np.random.default_rng(0)))
+    print("%d instances of %d geometry records" % (scene.ninstances, len(scene.shapes)))
+    scene.bvh = BVH(scene)
+    t = time.time()
+    image = packet.render(scene, packet.camera, 320, 240, 4, progress=None)
+    print("320x240x4 rendered in %.2fs" % (time.time() - t))
+    framebuffer.save('result7-instances.png', image)
@@ -0,0 +1,48 @@
+import os, time
+import numpy as np
+import framebuffer
+
+# indexed triangle meshes: Wavefront .obj files are loaded into flat vertex and index arrays,
+# and every ray of a packet is tested against every triangle of a (BVH leaf) at once with the Moller-Trumbore algorithm
+
+def load_obj(filename): # vertices (V,3) and triangles (T,3), polygons are triangulated as fans
+    vertices, triangles = [], []
+    with open(filename) as f:
+        for line in f:
+            token = line.split()
+            if not token: continue
+            if token[0] == 'v':
+                vertices.append([float(x) for x in token[1:4]])
+            elif token[0] == 'f':
+                face = [ int(t.split('/')[0]) for t in token[1:] ] # v/vt/vn, only the vertex index matters here
+                face = [ i-1 if i > 0 else len(vertices)+i for i in face ] # 1-based, negative indices are relative
+                triangles += [ [face[0], face[k], face[k+1]] for k in range(1, len(face)-1) ]
+    return np.array(vertices, dtype=float).reshape(-1, 3), np.array(triangles, dtype=int).reshape(-1, 3)
+
+def triangle_intersect(v0, e1, e2, ray_origin, ray_direction): # triangles v0, v0+e1, v0+e2; every ray against every triangle
+    pvec = np.cross(ray_direction[:,None,:], e2[None,:,:])
+    det = np.einsum('jk,ijk->ij', e1, pvec)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1/det                                       # det = 0: the ray is parallel to the triangle
+        tvec = ray_origin[:,None,:] - v0[None,:,:]
+        u = np.einsum('ijk,ijk->ij', tvec, pvec)*inv
+        qvec = np.cross(tvec, e1[None,:,:])
+        v = np.einsum('ik,ijk->ij', ray_direction, qvec)*inv
+        t = np.einsum('jk,ijk->ij', e2, qvec)*inv
+        hit = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 1e-6) # two-sided, the epsilon avoids self-intersections
+    return np.where(hit, t, np.inf) # distance to the intersection point, inf means no intersection
+
+head = os.path.join(os.path.dirname(__file__), '../tinyrenderer/tangent/src/african_head.obj')
+
+if __name__ == '__main__':
+    from scene import Scene, tiny7
+    from bvh import BVH
+    import packet
+    scene = Scene(tiny7[:3] + [ {'mesh': head, 'scale': [1.5, -1.5, 1.5], 'offset': [4.2, 0.5, 11], 'color': [.9, .8, .7], 'hot': False} ] + tiny7[4:])
+    t = time.time()
+    scene.bvh = BVH(scene)
+    print("%d triangles, BVH built in %.2fs" % (scene.ntriangles, time.time() - t))
+    t = time.time()
+    image = packet.render(scene, packet.camera, 320, 240, 4, progress=None)
+    print("320x240x4 rendered in %.2fs" % (time.time() - t))
+    framebuffer.save('result7-mesh.png', image)
@@ -0,0 +1,209 @@
+from functools import partial
+import numpy as np
+import framebuffer
+from scene import Scene, tiny7, kinds
+from camera import Camera
+from mesh import triangle_intersect
+import tiles, sampler
+
+# the same path tracer as tiny7.py, but instead of one ray at a time we trace a whole packet of rays:
+# ray origins and directions are (n,3) arrays, and every routine below processes all n rays at once
+
+def box_intersect(bmin, bmax, ray_origin, ray_direction):
+    n, m = len(ray_direction), len(bmin)
+    dist, axis = np.full((n, m), np.inf), np.full((n, m), -1) # every ray against every box, inf means no intersection
+    for i in range(3): # for each coordinate axis
+        di = ray_direction[:,i,None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d = (np.where(di>0, bmin[:,i], bmax[:,i]) - ray_origin[:,i,None])/di
+            point = ray_origin[:,None,:] + ray_direction[:,None,:]*d[...,None] # intersection between the rays and the planes
+        j, k = (i+1)%3, (i+2)%3
+        ok = (np.abs(di)>=1e-3) & (d>0) & np.isinf(dist) & \
+             (point[...,j] > bmin[:,j]) & (point[...,j] < bmax[:,j]) & \
+             (point[...,k] > bmin[:,k]) & (point[...,k] < bmax[:,k]) # the first facet found wins, as in the scalar version
+        dist[ok], axis[ok] = d[ok], i
+    return dist, axis # the normal is -sign(ray_direction[axis]) along the axis
+
+def sphere_intersect(center, radius, ray_origin, ray_direction):
+    oc = center[None,:,:] - ray_origin[:,None,:] # every ray against every sphere
+    proj = np.einsum('ik,ijk->ij', ray_direction, oc)
+    delta = radius**2 + proj**2 - np.einsum('ijk,ijk->ij', oc, oc)
+    t = proj - np.sqrt(np.maximum(delta, 0))
+    return np.where((delta>0) & (t>0), t, np.inf) # distance to the intersection point, inf means no intersection
+
+def instance_intersect(scene, inst, ray_origin, ray_direction): # every ray against every instance, the rays are brought into the object spaces
+    n, m = len(ray_direction), len(inst)
+    dist, axis = np.full((n, m), np.inf), np.full((n, m), -1)
+    inverse = scene.inverse[inst]
+    o = np.einsum('jkl,il->ijk', inverse[:,:3,:3], ray_origin) + inverse[:,:3,3]
+    d = np.einsum('jkl,il->ijk', inverse[:,:3,:3], ray_direction)
+    length = np.linalg.norm(d, axis=-1) # the transforms may scale: object space distances are measured along unit directions
+    d /= length[...,None]
+    shape = scene.instances[inst,0].astype(int)
+    for g in np.unique(shape): # all the instances of a geometry record are tested at once
+        c = np.flatnonzero(shape == g)
+        oc, dc, record = o[:,c].reshape(-1, 3), d[:,c].reshape(-1, 3), scene.shapes[g]
+        if record[0] == 0:
+            t, a = sphere_intersect(record[None,1:4], record[4:5], oc, dc), -1
+        else:
+            t, a = box_intersect(record[None,1:4], record[None,4:7], oc, dc)
+            a = a.reshape(n, len(c))
+        dist[:,c], axis[:,c] = t.reshape(n, len(c))/length[:,c], a
+    return dist, axis # the same as box_intersect: the box facets hit, in the object space
+
+def normalized(vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+def reflect(vectors, normals, u, roughness=1/6.): # u is a (n,3) array of uniform numbers in [0,1), see sampler.py
+    return normalized(vectors - 2*np.einsum('ij,ij->i', vectors, normals)[:,None]*normals + (2*u - 1)*roughness)
+
+def scatter(scene, material, vectors, normals, u): # new directions of the rays hitting the materials, all the kinds at once
+    kind, roughness = scene.materials[material,0], scene.materials[material,4]
+    z, phi = 2*u[:,0] - 1, 2*np.pi*u[:,1]   # diffuse: cosine-weighted around the normal (the normal plus a random unit vector)
+    unit = np.stack((np.sqrt(1 - z**2)*np.cos(phi), np.sqrt(1 - z**2)*np.sin(phi), z), axis=1)
+    return np.where((kind == kinds.index('diffuse'))[:,None], normalized(normals + unit), reflect(vectors, normals, u, roughness[:,None]))
+
+def intersect(scene, prims, ray_origin, ray_direction): # every ray against the primitives prims (numbered as in the scene)
+    ns, nb, nt = scene.nspheres, scene.nboxes, scene.ntriangles
+    s, b = prims[prims < ns], prims[(prims >= ns) & (prims < ns+nb)] - ns # is it a sphere, a box, a triangle or an instance?
+    t, i = prims[(prims >= ns+nb) & (prims < ns+nb+nt)] - ns - nb, prims[prims >= ns+nb+nt] - ns - nb - nt
+    dbox, abox = box_intersect(scene.bmin[b], scene.bmax[b], ray_origin, ray_direction)
+    dinst, ainst = instance_intersect(scene, i, ray_origin, ray_direction)
+    dist = np.hstack((sphere_intersect(scene.center[s], scene.radius[s], ray_origin, ray_direction), dbox,
+                      triangle_intersect(scene.v0[t], scene.e1[t], scene.e2[t], ray_origin, ray_direction), dinst))
+    axis = np.hstack((np.full((len(ray_direction), len(s)), -1), abox, np.full((len(ray_direction), len(t)), -1), ainst))
+    return np.hstack((s, b + ns, t + ns + nb, i + ns + nb + nt)), dist, axis # primitives (reordered), distances to them and box facets hit
+
+def scene_intersect(scene, ray_origin, ray_direction):
+    if scene.bvh is not None: # the acceleration structure returns the very same nearest hit as the linear scan below
+        return scene.bvh.intersect(scene, ray_origin, ray_direction)
+    n = len(ray_direction)
+    prims, dist, axis = intersect(scene, np.arange(scene.nprimitives), ray_origin, ray_direction)
+    k = np.argmin(dist, axis=1)                 # the nearest primitive for each ray
+    return surface(scene, ray_origin, ray_direction, dist[np.arange(n), k], prims[k], axis[np.arange(n), k])
+
+def surface(scene, ray_origin, ray_direction, nearest, k, axis): # primitive k was hit at distance nearest, through the facet axis if it is a box
+    normal = np.zeros((len(ray_direction), 3))
+    ns, nb, nt = scene.nspheres, scene.nboxes, scene.ntriangles
+    s = np.flatnonzero((k < ns) & (nearest < np.inf)) # is it a sphere, a box, a triangle or an instance?
+    normal[s] = (ray_origin[s] + ray_direction[s]*nearest[s,None] - scene.center[k[s]])/scene.radius[k[s],None]
+    b = np.flatnonzero((k >= ns) & (k < ns+nb) & (nearest < np.inf))
+    normal[b, axis[b]] = -np.sign(ray_direction[b, axis[b]])
+    t = np.flatnonzero((k >= ns+nb) & (k < ns+nb+nt) & (nearest < np.inf))
+    n = normalized(np.cross(scene.e1[k[t]-ns-nb], scene.e2[k[t]-ns-nb]))
+    normal[t] = n*-np.sign(np.einsum('ij,ij->i', n, ray_direction[t]))[:,None] # two-sided triangles: the normal faces the ray
+    r = np.flatnonzero((k >= ns+nb+nt) & (nearest < np.inf)) # instances: the normal of the geometry record is computed in the object space
+    inverse = scene.inverse[k[r]-ns-nb-nt]
+    record = scene.shapes[scene.instances[k[r]-ns-nb-nt,0].astype(int)]
+    point = np.einsum('ikl,il->ik', inverse[:,:3,:3], ray_origin[r] + ray_direction[r]*nearest[r,None]) + inverse[:,:3,3] # in the object space
+    d = np.einsum('ikl,il->ik', inverse[:,:3,:3], ray_direction[r])
+    n = np.zeros((len(r), 3))
+    sphere = record[:,0] == 0
+    n[sphere] = point[sphere] - record[sphere,1:4]
+    box = np.flatnonzero(~sphere)
+    n[box, axis[r[box]]] = -np.sign(d[box, axis[r[box]]])
+    normal[r] = normalized(np.einsum('ilk,il->ik', inverse[:,:3,:3], n)) # normals go back to the world by the inverse transpose
+    return nearest, normal, scene.material[k], np.where(nearest < np.inf, k, -1) # distance to the hit (inf if none), normal at the point,
+                                                                               # material and index of the primitive (-1 if none)
+
+def lights(scene): # the emissive spheres, the only lights sampled explicitly
+    return np.flatnonzero(scene.materials[scene.material[:scene.nspheres],0] == kinds.index('emissive'))
+
+def light_pdf(scene, light, point): # solid angle density of the light samples: a light chosen uniformly, then a direction uniformly in its cone
+    dc = np.linalg.norm(scene.center[light] - point, axis=1)
+    cosmax = np.sqrt(np.maximum(1 - (scene.radius[light]/dc)**2, 0))
+    return 1/(len(lights(scene))*2*np.pi*(1 - cosmax))
+
+def light_sample(scene, point, u): # directions from the points towards the emissive spheres, the lights chosen and the distances to them
+    light = lights(scene)
+    light = light[np.minimum((u[:,0]*len(light)).astype(int), len(light)-1)]
+    w = normalized(scene.center[light] - point)
+    dc = np.linalg.norm(scene.center[light] - point, axis=1)
+    cosmax = np.sqrt(np.maximum(1 - (scene.radius[light]/dc)**2, 0))
+    cost = 1 - u[:,1]*(1 - cosmax)             # uniform in the cone subtended by the sphere
+    sint, phi = np.sqrt(np.maximum(1 - cost**2, 0)), 2*np.pi*u[:,2]
+    a = normalized(np.cross(w, np.where(np.abs(w[:,:1]) < .9, [[1., 0, 0]], [[0, 1., 0]])))
+    direction = normalized(w*cost[:,None] + (a*np.cos(phi)[:,None] + np.cross(w, a)*np.sin(phi)[:,None])*sint[:,None])
+    oc = scene.center[light] - point
+    proj = np.einsum('ij,ij->i', direction, oc)
+    distance = proj - np.sqrt(np.maximum(scene.radius[light]**2 + proj**2 - np.einsum('ij,ij->i', oc, oc), 0))
+    return direction, light, distance
+
+def shadow_intersect(scene, ray_origin, ray_direction): # distances to the nearest hits of the shadow rays, a stage of its own for stats.py
+    return scene_intersect(scene, ray_origin, ray_direction)[0]
+
+def direct(scene, point, normal, u): # next event estimation: the light arriving straight from the emissive spheres to diffuse points,
+    direction, light, distance = light_sample(scene, point, u) # weighted against the diffuse bounces by the balance heuristic
+    cos = np.einsum('ij,ij->i', direction, normal)
+    ok = np.flatnonzero((cos > 0) & (np.linalg.norm(scene.center[light] - point, axis=1) > scene.radius[light]))
+    radiance = np.zeros_like(point)
+    if len(ok):
+        dist = shadow_intersect(scene, point[ok], direction[ok])
+        ok = ok[dist >= distance[ok]*(1 - 1e-9)]                     # nothing in front of the light
+        pdf = light_pdf(scene, light[ok], point[ok]) + cos[ok]/np.pi # light + cosine-weighted bounce
+        radiance[ok] = scene.materials[scene.material[light[ok]],1:4]*(cos[ok]/np.pi/pdf)[:,None]
+    return radiance # to be multiplied by the albedo
+
+def trace(scene, eye, ray, samples, maxdepth=3, roulette=None, nee=False): # iterative: no recursion, the color of the path is carried in the throughput
+    result = np.zeros_like(ray)
+    throughput = np.ones_like(ray)   # the product of the colors met along the path so far
+    alive = np.arange(len(ray))      # indices of the rays that are still bouncing
+    nee = nee and len(lights(scene)) > 0
+    diffuse, bounced = np.zeros(len(ray), dtype=bool), np.zeros_like(ray) # the ray was scattered by a diffuse surface of normal bounced
+    for depth in range(maxdepth):
+        dist,normal,material,prim = scene_intersect(scene, eye, ray)
+        color = scene.materials[material,1:4]              # albedo, or emitted light
+        hot = (scene.materials[material,0] == kinds.index('emissive')) & np.isfinite(dist)
+        done = hot | np.isinf(dist) | (depth+1==maxdepth) # emissive objects and misses terminate the path, as does the last bounce
+        weight = np.ones(len(ray))
+        if nee: # a diffuse bounce hitting a light could have been sampled by the light too, the other emitters are never sampled
+            h = np.flatnonzero(hot & diffuse & np.isin(prim, lights(scene)))
+            light = prim[h]
+            bounce = np.einsum('ij,ij->i', ray[h], bounced[h])/np.pi
+            weight[h] = bounce/(bounce + light_pdf(scene, light, eye[h]))
+        result[alive[done]] += throughput[done] * np.where(hot[done,None], color[done]*weight[done,None], ambient_color)
+        live = ~done                                       # the rest of the packet is scattered
+        eye = eye[live] + ray[live]*dist[live,None]
+        diffuse = scene.materials[material[live],0] == kinds.index('diffuse')
+        bounced = normal[live]
+        if nee:
+            d = np.flatnonzero(diffuse)
+            u = samples.uniform(sampler.dimension(depth) + 4, 3, alive[live][d])
+            result[alive[live][d]] += throughput[live][d]*color[live][d]*direct(scene, eye[d], bounced[d], u)
+        ray = scatter(scene, material[live], ray[live], normal[live], samples.uniform(sampler.dimension(depth), 3, alive[live]))
+        throughput = throughput[live]*color[live]
+        alive = alive[live]
+        if roulette is not None and depth+1 >= roulette: # Russian roulette: a path survives with a probability given by its throughput,
+            p = np.minimum(throughput.max(axis=1), .95)   # and the survivors are reweighted, so the estimate stays unbiased
+            survive = samples.uniform(sampler.dimension(depth) + 3, 1, alive)[:,0] < p
+            eye, ray, alive, diffuse, bounced = eye[survive], ray[survive], alive[survive], diffuse[survive], bounced[survive]
+            throughput = throughput[survive]/p[survive,None]
+        if not len(alive): break # every path of the packet is over
+    return result
+
+def shade(scene, camera, width, height, nrays, maxdepth, roulette, jitter, sampler, i, j, rng, nee=False, first=0):
+    # mean color of the pixels (i,j), nrays samples each, all traced as one packet; the sample indices start at first, see cache.py
+    pixel, index = np.repeat(i*width + j, nrays), np.tile(first + np.arange(nrays), len(i))
+    samples = sampler.packet(pixel, index, rng)
+    if jitter: # every sample goes through a random point of the pixel
+        ray = camera.directions(width, height, np.repeat(i, nrays), np.repeat(j, nrays), samples.uniform(0, 2, np.arange(len(pixel))) - .5)
+    else:
+        ray = np.repeat(camera.directions(width, height, i, j), nrays, axis=0)
+    return trace(scene, np.tile(camera.position, (len(ray), 1)), ray, samples, maxdepth, roulette, nee).reshape(-1, nrays, 3).mean(axis=1)
+
+def render(scene, camera, width, height, nrays, maxdepth=3, roulette=None, jitter=False, sampler=sampler.WhiteNoise(), nee=False, first=0, tile=32, seed=0, workers=None, progress=tiles.print_progress):
+    return tiles.render(partial(shade, scene, camera, width, height, nrays, maxdepth, roulette, jitter, sampler, nee=nee, first=first), width, height, tile, workers, seed, progress)
+
+def guides(scene, camera, width, height): # first-hit buffers of the primary rays through the pixel centers: normal, albedo and distance
+    ray = camera.directions(width, height).reshape(-1, 3)
+    dist, normal, material, _ = scene_intersect(scene, np.tile(camera.position, (len(ray), 1)), ray)
+    albedo = np.where(np.isinf(dist)[:,None], ambient_color, scene.materials[material,1:4]) # the background is "made" of the ambient color
+    return normal.reshape(height, width, 3), albedo.reshape(height, width, 3), dist.reshape(height, width)
+
+width, height = 640, 480
+camera, ambient_color = Camera(azimuth=30*np.pi/180), np.array([.5]*3)
+nrays, maxdepth = 10, 3
+
+if __name__ == '__main__':
+    image = render(Scene(tiny7), camera, width, height, nrays, maxdepth)
+    framebuffer.save('result7-packet.png', image)
@@ -0,0 +1,35 @@
+import time
+import numpy as np
+import framebuffer
+from scene import Scene, tiny7
+import packet, sampler
+
+# low-latency preview for scene editing: the compiled scene (and its BVH, if any) of the final render is traced in-process,
+# with no pool to start, first on a coarse grid of pixels, then on finer and finer ones, with a single bounce;
+# once at full resolution, jittered samples are added one at a time. Every step yields a full-size image.
+
+def upscale(image, width, height): # nearest neighbour
+    h, w = image.shape[:2]
+    return image[np.arange(height)*h//height][:, np.arange(width)*w//width]
+
+def progressive(scene, camera, width, height, scales=(8, 4, 2, 1), nrays=8, maxdepth=2, sampler=sampler.WhiteNoise(), seed=0):
+    rng = np.random.default_rng(seed)
+    for s in tuple(scales) + ((1,) if tuple(scales)[-1:] != (1,) else ()): # one sample through the center of every coarse pixel, the last grid is the image
+        w, h = max(width//s, 1), max(height//s, 1)
+        ray = camera.directions(w, h).reshape(-1, 3)
+        image = packet.trace(scene, np.tile(camera.position, (len(ray), 1)), ray, sampler.packet(np.arange(w*h), np.zeros(w*h, dtype=int), rng), maxdepth)
+        yield upscale(image.reshape(h, w, 3), width, height)
+    pixel = np.arange(width*height)
+    for n in range(1, nrays): # the running mean over jittered samples
+        samples = sampler.packet(pixel, np.full(width*height, n), rng)
+        ray = camera.directions(width, height, pixel // width, pixel % width, samples.uniform(0, 2, pixel) - .5)
+        color = packet.trace(scene, np.tile(camera.position, (len(ray), 1)), ray, samples, maxdepth).reshape(height, width, 3)
+        image = image.reshape(height, width, 3) + (color - image.reshape(height, width, 3))/(n + 1)
+        yield image
+
+if __name__ == '__main__': # move the small sphere around, as one would while editing the scene
+    for x in [2.8, 1.8, 0.8]:
+        scene, start = Scene([ {**o, 'center': [x, 1.1, 7]} if o.get('radius') == .9 else o for o in tiny7 ]), time.time()
+        for n, image in enumerate(progressive(scene, packet.camera, packet.width, packet.height, nrays=2)):
+            print("x = %.1f, step %d: %.3fs" % (x, n, time.time() - start))
+    framebuffer.save('result7-preview.png', image)
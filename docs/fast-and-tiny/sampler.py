@@ -0,0 +1,131 @@
+import numpy as np
+
+# samplers: uniform numbers in [0,1) keyed by pixel, sample index and dimension;
+# the dimensions 0,1 jitter the primary ray, then every bounce b uses the dimensions 2+7b .. 8+7b (3 for the reflection, 1 for the roulette, 3 for the light sample).
+# A sampler is bound to a packet of rays (one pixel and one sample index per ray) by packet(), the result answers uniform(dimension, count, rays)
+# with a (len(rays), count) array for the rays of the packet still alive, all at once.
+
+def dimension(bounce): # first dimension used at a given bounce
+    return 2 + 7*bounce
+
+primes = [2]
+
+def prime(n): # the n-th prime number, n from 0; the list grows on demand, so that there is no limit on the number of dimensions
+    while len(primes) <= n:
+        p = primes[-1] + 1
+        while any(p % q == 0 for q in primes if q*q <= p): p += 1
+        primes.append(p)
+    return primes[n]
+
+def hash32(*keys): # integer hash of the keys, vectorized
+    h = np.uint64(0x9E3779B97F4A7C15)
+    with np.errstate(over='ignore'): # wrap-around multiplication is the whole point
+        for k in keys:
+            h = (h ^ np.asarray(k, dtype=np.uint64)) * np.uint64(0xBF58476D1CE4E5B9)
+            h ^= h >> np.uint64(31)
+    return (h >> np.uint64(32)).astype(np.uint32)
+
+def hash01(*keys):
+    return hash32(*keys) / 2.**32
+
+class WhiteNoise: # the good old np.random, exactly the same numbers as before
+    def packet(self, pixel, index, rng):
+        return self.Packet(rng)
+
+    class Packet:
+        def __init__(self, rng):
+            self.rng = rng
+        def uniform(self, dimension, count, rays):
+            return self.rng.uniform(size=(len(rays), count))
+
+class Halton: # radical inverses in prime bases, decorrelated between pixels by a random shift (Cranley-Patterson rotation)
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def packet(self, pixel, index, rng):
+        return self.Packet(self, pixel, index)
+
+    class Packet:
+        def __init__(self, sampler, pixel, index):
+            self.sampler, self.pixel, self.index = sampler, pixel, index
+        def uniform(self, dimension, count, rays):
+            return np.stack([ (radical_inverse(prime(d), self.index[rays]) + hash01(self.sampler.seed, self.pixel[rays], d)) % 1.
+                              for d in range(dimension, dimension+count) ], axis=1)
+
+def radical_inverse(base, index):
+    index, result, scale = np.array(index, dtype=np.int64), np.zeros(np.shape(index)), 1./base
+    while np.any(index):
+        result += (index % base)*scale
+        index //= base
+        scale /= base
+    return result
+
+def sobol_directions(s, a, m, bits=32): # direction numbers from a primitive polynomial (Joe & Kuo notation)
+    v = [ m[k] << (bits-1-k) for k in range(s) ]
+    for k in range(s, bits):
+        x = v[k-s] ^ (v[k-s] >> s)
+        for j in range(1, s):
+            x ^= ((a >> (s-1-j)) & 1) * v[k-j]
+        v.append(x)
+    return np.array(v, dtype=np.uint64)
+
+class Sobol: # padded Sobol: the first four Sobol dimensions for every block of dimensions,
+             # blocks are decorrelated by a per pixel and per dimension shuffle of the sample index and a digital shift
+    directions = [ np.array([1 << (31-k) for k in range(32)], dtype=np.uint64), sobol_directions(1, 0, [1]),
+                   sobol_directions(2, 1, [1, 3]), sobol_directions(3, 1, [1, 3, 1]) ]
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def packet(self, pixel, index, rng):
+        return self.Packet(self, pixel, index)
+
+    class Packet:
+        def __init__(self, sampler, pixel, index):
+            self.sampler, self.pixel, self.index = sampler, pixel, index
+        def uniform(self, dimension, count, rays):
+            pixel = self.pixel[rays]
+            index = self.index[rays] ^ (hash32(self.sampler.seed, pixel, dimension) & np.uint32(0xffff)) # xor with a constant permutes the indices
+            index, bits = index.astype(np.uint64), int(index.max(initial=0)).bit_length() # only the bits actually used by the indices
+            result = np.empty((len(rays), count))
+            for d in range(count):
+                x = np.zeros(len(rays), dtype=np.uint64)
+                for b in range(bits):
+                    x ^= ((index >> np.uint64(b)) & np.uint64(1)) * Sobol.directions[d][b]
+                x ^= hash32(self.sampler.seed, pixel, dimension, d+1).astype(np.uint64) # digital shift
+                result[:,d] = x / 2.**32
+            return result
+
+def blue_noise_texture(size=64, sigma=1.9, seed=0): # ranks of a void-and-cluster-like texture: the next pixel is always put into the largest void
+    y, x = np.meshgrid(np.arange(size), np.arange(size), indexing='ij')
+    dy, dx = np.minimum(y, size-y), np.minimum(x, size-x)                  # toroidal distances to the pixel (0,0)
+    kernel = np.exp(-(dx**2 + dy**2)/(2*sigma**2)).ravel()
+    energy = np.random.default_rng(seed).uniform(size=size*size)*1e-6      # random tie-breaking
+    rank = np.empty(size*size)
+    for r in range(size*size):
+        p = np.argmin(energy)
+        rank[p] = r
+        energy[p] = np.inf
+        energy += np.roll(kernel.reshape(size, size), (p//size, p%size), axis=(0, 1)).ravel()
+    return ((rank + .5)/size**2).reshape(size, size)
+
+class BlueNoise: # a blue noise texture tiled over the image, offset per dimension and animated over the samples by an additive recurrence
+    def __init__(self, width, seed=0):
+        self.width, self.seed = width, seed
+        self.texture = blue_noise_texture(seed=seed)
+
+    def packet(self, pixel, index, rng):
+        return self.Packet(self, pixel, index)
+
+    class Packet:
+        def __init__(self, sampler, pixel, index):
+            self.sampler, self.pixel, self.index = sampler, pixel, index
+        def uniform(self, dimension, count, rays):
+            size = len(self.sampler.texture)
+            i, j = self.pixel[rays] // self.sampler.width, self.pixel[rays] % self.sampler.width
+            result = np.empty((len(rays), count))
+            for d in range(dimension, dimension+count):
+                oi, oj = hash32(self.sampler.seed, d) % size, hash32(self.sampler.seed, d, 1) % size
+                alpha = np.sqrt(prime(d)) % 1.  # a different irrational step for every dimension
+                result[:,d-dimension] = (self.sampler.texture[(i + oi) % size, (j + oj) % size] + self.index[rays]*alpha) % 1.
+            return result
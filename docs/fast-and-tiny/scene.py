@@ -0,0 +1,79 @@
+import numpy as np
+from mesh import load_obj
+
+# declarative description of the scene rendered by tiny7.py
+tiny7 = [ {'center': [  6,   0,  7], 'radius':  2, 'color': [1., .4, .6], 'hot': False}, # two spheres
+          {'center': [2.8, 1.1,  7], 'radius': .9, 'color': [1., 1., .3], 'hot': False},
+          {'center': [  5, -10, -7], 'radius':  8, 'color': [1., 1., 1.], 'hot': True},  # one of the spheres is "hot" (incandescent)
+          {'min': [3, -4, 11], 'max': [ 7,   2, 13], 'color': [.4, .7, 1.], 'hot': False}, # two boxes
+          {'min': [0,  2,  6], 'max': [11, 2.2, 16], 'color': [.6, .7, .6], 'hot': False} ]
+
+kinds = ['diffuse', 'glossy', 'emissive'] # materials: an object has an optional 'material' key (one of these) and a 'roughness' for the glossy ones
+
+def material(o): # row of the material table: kind, color (3), roughness; without a 'material' key, the 'hot' flag of tiny7 means emissive
+    kind = o.get('material', 'emissive' if o.get('hot') else 'glossy')
+    return [kinds.index(kind), *o['color'], o.get('roughness', 1/6. if kind == 'glossy' else 0.)]
+
+def hot(o):
+    return material(o)[0] == kinds.index('emissive')
+
+class Scene:
+    # the scene compiled once into struct-of-arrays storage:
+    # one contiguous row per sphere: center (3), radius, color (3), hot
+    # one contiguous row per box:    min (3), max (3), color (3), hot
+    # triangle meshes ({'mesh': 'file.obj', 'scale': ..., 'offset': ..., 'color': ..., 'hot': ...}) are merged
+    # into one vertex array and one index array, with one row per triangle: color (3), hot
+    # instances ({'instance': geometry, 'transform': 4x4 object to world matrix, 'color': ..., 'hot': ...}) share their geometry,
+    # a sphere or a box given in object space: one row per geometry record: kind (0 sphere, 1 box), center (3), radius, 0, 0 or min (3), max (3),
+    # one row per instance: geometry, color (3), hot, and the world to object matrix used to bring the rays into the object space
+    # the distinct materials form a table (one row per material: kind, color (3), roughness), and every primitive has a material id
+    def __init__(self, description):
+        self.spheres = np.array([[*o['center'], o['radius'], *o['color'], hot(o)] for o in description if 'center' in o], dtype=float).reshape(-1, 8)
+        self.boxes   = np.array([[*o['min'],    *o['max'],   *o['color'], hot(o)] for o in description if 'min'    in o], dtype=float).reshape(-1, 10)
+        materials = [ material(o) for o in description if 'center' in o ] + [ material(o) for o in description if 'min' in o ] # in the primitive order
+        self.center, self.radius = self.spheres[:,:3], self.spheres[:,3] # named views of the sphere table
+        self.bmin, self.bmax     = self.boxes[:,:3], self.boxes[:,3:6]   # named views of the box table
+        self.vertices, self.triangles, self.meshes = np.zeros((0, 3)), np.zeros((0, 3), dtype=int), np.zeros((0, 4))
+        for o in description:
+            if 'mesh' not in o: continue
+            v, t = load_obj(o['mesh'])
+            self.triangles = np.vstack((self.triangles, t + len(self.vertices)))
+            self.vertices  = np.vstack((self.vertices, v*o.get('scale', 1) + o.get('offset', 0)))
+            self.meshes    = np.vstack((self.meshes, np.tile([*o['color'], hot(o)], (len(t), 1))))
+            materials += [material(o)]*len(t)
+        records, self.instances, transforms = {}, [], []
+        for o in description:
+            if 'instance' not in o: continue
+            g = o['instance']
+            records.setdefault(id(g), (len(records), [0, *g['center'], g['radius'], 0, 0] if 'center' in g else [1, *g['min'], *g['max']]))
+            self.instances.append([records[id(g)][0], *o['color'], hot(o)])
+            materials.append(material(o))
+            transforms.append(o['transform'])
+        self.shapes    = np.array([r for _,r in sorted(records.values())], dtype=float).reshape(-1, 7)
+        self.instances = np.array(self.instances, dtype=float).reshape(-1, 5)
+        self.transform = np.array(transforms, dtype=float).reshape(-1, 4, 4)
+        self.inverse   = np.linalg.inv(self.transform)
+        self.v0 = self.vertices[self.triangles[:,0]]      # Moller-Trumbore wants a vertex and two edges per triangle
+        self.e1 = self.vertices[self.triangles[:,1]] - self.v0
+        self.e2 = self.vertices[self.triangles[:,2]] - self.v0
+        self.color = np.vstack((self.spheres[:,4:7], self.boxes[:,6:9], self.meshes[:,:3], self.instances[:,1:4])) # primitive k is the sphere k if k < nspheres,
+        self.hot   = np.hstack((self.spheres[:,7], self.boxes[:,9], self.meshes[:,3], self.instances[:,4])) > 0  # then come the boxes, the triangles and the instances
+        self.materials, self.material = np.unique(np.array(materials, dtype=float).reshape(-1, 5), axis=0, return_inverse=True)
+        self.material = self.material.ravel() # material id of every primitive
+        self.bvh   = None # optional acceleration structure, see bvh.py
+
+    nspheres = property(lambda self: len(self.spheres))
+    nboxes   = property(lambda self: len(self.boxes))
+    ntriangles = property(lambda self: len(self.triangles))
+    ninstances = property(lambda self: len(self.instances))
+    nprimitives = property(lambda self: self.nspheres + self.nboxes + self.ntriangles + self.ninstances)
+
+def affine(translation=(0, 0, 0), rotation=(0, 0, 0), scale=1.): # object to world 4x4 matrix: scaling, rotations around X, Y, Z (radians), translation
+    m = np.diag(np.append(np.broadcast_to(np.asarray(scale, dtype=float), 3), 1.))
+    for axis, angle in enumerate(rotation):
+        i, j = (axis+1)%3, (axis+2)%3
+        r = np.eye(4)
+        r[i,i], r[i,j], r[j,i], r[j,j] = np.cos(angle), -np.sin(angle), np.sin(angle), np.cos(angle)
+        m = r @ m
+    m[:3,3] = translation
+    return m
@@ -0,0 +1,93 @@
+import sys, json, time, functools
+import numpy as np
+
+# profiling counters for the hot path of the tracers (tiny7.py, packet.py, bvh.py):
+# rays cast, intersection tests and hits per primitive type, bounce depth histogram, calls and wall time per stage.
+# The shadow rays of the next event estimation are counted apart, out of the rays cast and of the depth histogram,
+# and so are the rays cast outside of any trace (the background pass of adaptive.py, the first-hit buffers of packet.guides).
+# The functions are wrapped only inside a "with profile(...)" block, there is no overhead at all otherwise.
+# Worker processes keep their own counters, profile with workers=1.
+
+stages = ['trace', 'scene_intersect', 'shadow_intersect', 'sphere_intersect', 'box_intersect', 'reflect']
+
+class profile:
+    def __init__(self, *modules, output=None):
+        self.modules, self.output = modules, output
+        self.calls, self.time = dict.fromkeys(stages, 0), dict.fromkeys(stages, 0.)
+        self.tests, self.hits = {'sphere': 0, 'box': 0}, {'sphere': 0, 'box': 0, 'scene': 0}
+        self.rays, self.depth, self.current = 0, [], 0
+        self.shadows, self.shadow = 0, False # shadow rays cast, inside a shadow_intersect call
+        self.untraced, self.tracing = 0, 0   # rays cast outside of any trace, nesting level of the trace calls
+
+    def count(self, stage, args, result): # scalar versions work on one ray, the packet ones on (n,3) arrays
+        if stage == 'trace':
+            self.current = args[3] if np.ndim(args[2]) == 1 else 0 # scalar trace(scene, eye, ray, depth) is recursive
+        elif stage == 'shadow_intersect':
+            self.shadows += len(args[2])
+        elif stage == 'scene_intersect' and not self.shadow and not self.tracing:
+            self.untraced += 1 if np.ndim(args[2]) == 1 else len(args[2])
+        elif stage == 'scene_intersect' and not self.shadow:
+            scalar = np.ndim(args[2]) == 1
+            n = 1 if scalar else len(args[2])
+            self.depth += [0]*(self.current + 1 - len(self.depth))
+            self.depth[self.current] += n
+            self.current += 1 # the packet trace calls it once per bounce
+            self.rays += n
+            self.hits['scene'] += int(result[0]) if scalar else int(np.count_nonzero(np.isfinite(result[0])))
+        elif stage in ('sphere_intersect', 'box_intersect'):
+            kind = stage.split('_')[0]
+            if np.ndim(args[3]) == 1: # scalar
+                self.tests[kind] += 1
+                self.hits[kind] += int(result[0])
+            else:
+                self.tests[kind] += len(args[3])*len(args[0])
+                dist = result[0] if kind == 'box' else result
+                self.hits[kind] += int(np.count_nonzero(np.isfinite(dist)))
+
+    def wrap(self, module, stage):
+        f = getattr(module, stage)
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if stage == 'trace': self.count(stage, args, None) # before the call: it sets the depth for the intersections to come
+            if stage == 'shadow_intersect': self.shadow = True
+            if stage == 'trace': self.tracing += 1
+            start = time.perf_counter()
+            try:
+                result = f(*args, **kwargs)
+            finally:
+                if stage == 'shadow_intersect': self.shadow = False
+                if stage == 'trace': self.tracing -= 1
+            self.time[stage] += time.perf_counter() - start
+            self.calls[stage] += 1
+            if stage != 'trace': self.count(stage, args, result)
+            return result
+        setattr(module, stage, wrapper)
+        return f
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.original = [ (m, s, self.wrap(m, s)) for m in self.modules for s in stages if hasattr(m, s) ]
+        return self
+
+    def __exit__(self, *exc):
+        for m, s, f in self.original: setattr(m, s, f)
+        self.wall = time.perf_counter() - self.start
+        if self.output:
+            with open(self.output, 'w') as out:
+                json.dump(self.summary(), out, indent=1)
+        return False
+
+    def summary(self): # inclusive times: scene_intersect contains the primitive tests, trace contains everything (recursively for tiny7.py)
+        return {'wall': self.wall, 'rays': self.rays, 'shadow rays': self.shadows, 'untraced rays': self.untraced, 'tests': self.tests, 'hits': self.hits, 'depth': self.depth,
+                'calls': self.calls, 'time': self.time}
+
+if __name__ == '__main__':
+    import packet, tiny7
+    from scene import Scene
+    width, height = 32, 24
+    tiny7.width, tiny7.height = width, height
+    with profile(tiny7) as scalar:
+        tiny7.render(tiny7.shade, width, height, workers=1, progress=None)
+    with profile(packet) as vectorized:
+        packet.render(Scene(tiny7.tiny7), packet.camera, width, height, tiny7.nrays, workers=1, progress=None)
+    json.dump({'tiny7': scalar.summary(), 'packet': vectorized.summary()}, sys.stdout, indent=1)
@@ -0,0 +1,75 @@
+import os, time
+import numpy as np
+from multiprocessing import Pool, shared_memory
+
+# tile scheduler: the image is split into tiles rendered by a pool of processes,
+# every worker writes its tiles directly into a frame buffer living in shared memory, only tile numbers travel back
+
+def split(width, height, size): # list of tiles (i0, i1, j0, j1), rows [i0, i1) and columns [j0, j1)
+    return [ (i, min(i+size, height), j, min(j+size, width)) for i in range(0, height, size) for j in range(0, width, size) ]
+
+def print_progress(p):
+    print("%d/%d" % (p['done'], p['total']))
+
+worker = {} # per-process state: the function to render a tile and the shared frame buffer
+
+def attach(shade, name, shape):
+    worker['memory'] = shared_memory.SharedMemory(name=name) # keep a reference, otherwise the buffer is unmapped
+    worker['image'] = np.ndarray(shape, buffer=worker['memory'].buf)
+    worker['shade'] = shade
+
+def render_tile(job):
+    index, (i0, i1, j0, j1), seed, params = job
+    rng = np.random.default_rng([seed, index]) # random stream of the tile, it does not depend on the number of workers
+    np.random.seed([seed, index])              # nor on the order of the tiles; the legacy global generator (tiny*.py) is reseeded too
+    i, j = np.meshgrid(np.arange(i0, i1), np.arange(j0, j1), indexing='ij')
+    worker['image'][i0:i1, j0:j1] = worker['shade'](i.ravel(), j.ravel(), rng, **params).reshape(i1-i0, j1-j0, 3)
+    return index
+
+class Workers: # a pool of processes, their state set up once by attach(*args); no pool at all for one worker, handy for debugging and profiling
+    def __init__(self, workers, attach, args):
+        self.pool = None if workers == 1 else Pool(workers or os.cpu_count(), attach, args)
+        if self.pool is None: attach(*args)
+
+    def map(self, function, jobs): # the results in the order of completion
+        return self.pool.imap_unordered(function, jobs) if self.pool else map(function, jobs)
+
+    def close(self): # the jobs still running are cut short
+        if self.pool:
+            self.pool.terminate()
+            self.pool.join()
+
+class Session: # a frame buffer in shared memory and a pool of workers, kept for several images of the same size (the frames of an animation)
+    def __init__(self, shade, width, height, tile=32, workers=None):
+        # shade(i, j, rng, **params) returns the (n,3) colors of the pixels (i[k], j[k]), i.e. a whole tile at once;
+        # it is sent to the workers once, along with everything it holds (a compiled scene, its BVH...)
+        self.jobs = list(enumerate(split(width, height, tile)))
+        self.memory = shared_memory.SharedMemory(create=True, size=height*width*3*8)
+        self.image = np.ndarray((height, width, 3), buffer=self.memory.buf)
+        self.workers = Workers(workers, attach, (shade, self.memory.name, self.image.shape))
+
+    def render(self, seed=0, progress=print_progress, **params): # the params (a camera...) travel with every tile
+        jobs, start = [ (index, tile, seed, params) for index, tile in self.jobs ], time.time()
+        for n, index in enumerate(self.workers.map(render_tile, jobs)):
+            if progress: progress({'done': n+1, 'total': len(jobs), 'tile': self.jobs[index][1], 'elapsed': time.time() - start})
+        return np.copy(self.image)
+
+    def close(self):
+        self.workers.close()
+        worker.pop('image', None) # release every view of the shared buffer before unmapping it
+        worker.clear()
+        del self.image
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def render(shade, width, height, tile=32, workers=None, seed=0, progress=print_progress):
+    # shade(i, j, rng) returns the (n,3) colors of the pixels (i[k], j[k]), i.e. a whole tile at once
+    with Session(shade, width, height, tile, workers) as session:
+        return session.render(seed, progress)
@@ -1,13 +1,9 @@
 import numpy as np
-import matplotlib.pyplot as plt
+import framebuffer
 
 width, height = 640, 480
-image = np.zeros((height, width, 3))
+i, j = framebuffer.grid(width, height) # all the pixels at once
 
-for i in range(height):
-    for j in range(width):
-        image[i,j] = np.array([j/width, i/height, 0])
-    print("%d/%d" % (i + 1, height))
-
-plt.imsave('result0.png', image)
+image = np.stack((j/width, i/height, np.zeros((height, width))), axis=-1)
 
+framebuffer.save('result0.png', image)
@@ -1,5 +1,5 @@
 import numpy as np
-import matplotlib.pyplot as plt
+import framebuffer
 
 def sphere_intersect(center, radius, ray_origin, ray_direction):
     proj = np.dot(ray_direction, center-ray_origin)
@@ -10,14 +10,14 @@ def sphere_intersect(center, radius, ray_origin, ray_direction):
     return False,None,None # no intersection
 
 width, height = 640, 480
-image = np.zeros((height, width, 3))
+image = framebuffer.allocate(width, height)
 
 for i in range(height):
     for j in range(width):
         image[i,j] = np.array([j/width, i/height, 0])
     print("%d/%d" % (i + 1, height))
 
-plt.imsave('result0.png', image)
+framebuffer.save('result0.png', image)
 
 center,radius = np.array([6, 0, 7]), 2
 eye,ray = np.zeros(3), np.array([.5, 0, 0.866])
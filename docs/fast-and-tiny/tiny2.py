@@ -1,5 +1,5 @@
 import numpy as np
-import matplotlib.pyplot as plt
+import framebuffer
 
 def sphere_intersect(center, radius, ray_origin, ray_direction):
     proj = np.dot(ray_direction, center-ray_origin)
@@ -19,7 +19,7 @@ def trace(eye, ray, depth):
 
 width, height, depth = 640, 480, 500
 ambient_color = np.array([.5]*3)
-image = np.zeros((height, width, 3))
+image = framebuffer.allocate(width, height)
 
 for i in range(height):
     for j in range(width):
@@ -27,5 +27,5 @@ for i in range(height):
         image[i, j] += trace(np.zeros(3), ray, 0)
     print("%d/%d" % (i + 1, height))
 
-plt.imsave('result2.png', image)
+framebuffer.save('result2.png', image)
 
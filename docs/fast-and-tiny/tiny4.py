@@ -1,5 +1,5 @@
 import numpy as np
-import matplotlib.pyplot as plt
+import framebuffer
 
 def box_intersect(bmin, bmax, ray_origin, ray_direction):
     for i in range(3): # for each coordinate axis
@@ -46,7 +46,7 @@ def trace(eye, ray, depth):
 
 width, height, depth = 640, 480, 500
 azimuth, ambient_color = 30*np.pi/180, np.array([.5]*3)
-image = np.zeros((height, width, 3))
+image = framebuffer.allocate(width, height)
 
 for i in range(height):
     for j in range(width):
@@ -56,5 +56,5 @@ for i in range(height):
         image[i, j] += trace(np.zeros(3), ray, 0)
     print("%d/%d" % (i + 1, height))
 
-plt.imsave('result4.png', image)
+framebuffer.save('result4.png', image)
 
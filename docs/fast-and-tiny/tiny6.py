@@ -1,5 +1,6 @@
 import numpy as np
-import matplotlib.pyplot as plt
+import framebuffer
+from tiles import render
 
 def box_intersect(bmin, bmax, ray_origin, ray_direction):
     for i in range(3): # for each coordinate axis
@@ -50,18 +51,19 @@ def trace(eye, ray, depth):
         return color * trace(point, reflect(ray, normal), depth+1) # accumulate color along the reflected ray
     return ambient_color                                           # no intersection
 
-width, height, depth = 640, 480, 500
-azimuth, ambient_color = 30*np.pi/180, np.array([.5]*3)
-image = np.zeros((height, width, 3))
-maxdepth = 4
-
-for i in range(height):
-    for j in range(width):
-        ray = normalized(np.array([j-width/2, i-height/2, depth]))        # emit the ray along Z axis
+def shade(i, j, rng): # colors of the pixels (i[k], j[k]) of a tile, see tiles.py
+    color = np.zeros((len(i), 3))
+    for k in range(len(i)):
+        ray = normalized(np.array([j[k]-width/2, i[k]-height/2, depth]))  # emit the ray along Z axis
         ray[0],ray[2] = (np.cos(azimuth)*ray[0] + np.sin(azimuth)*ray[2], # and then rotate it 30 degrees around Y axis
                         -np.sin(azimuth)*ray[0] + np.cos(azimuth)*ray[2])
-        image[i, j] += trace(np.zeros(3), ray, 0)
-    print("%d/%d" % (i + 1, height))
+        color[k] = trace(np.zeros(3), ray, 0)
+    return color
 
-plt.imsave('result6.png', image)
+width, height, depth = 640, 480, 500
+azimuth, ambient_color = 30*np.pi/180, np.array([.5]*3)
+maxdepth = 4
 
+if __name__ == '__main__':
+    image = render(shade, width, height) # the tiles are rendered on all the cores
+    framebuffer.save('result6.png', image)
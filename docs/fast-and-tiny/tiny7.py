@@ -1,5 +1,8 @@
 import numpy as np
-import matplotlib.pyplot as plt
+import framebuffer
+from tiles import render
+from scene import Scene, tiny7
+from camera import Camera
 
 def box_intersect(bmin, bmax, ray_origin, ray_direction):
     for i in range(3): # for each coordinate axis
@@ -27,42 +30,37 @@ def normalized(vector):
 def reflect(vector, normal):
     return normalized(vector - 2*np.dot(vector, normal)*normal + np.random.uniform(low=-1., high=1., size=3)/6.)
 
-def scene_intersect(ray_origin, ray_direction):
+def scene_intersect(scene, ray_origin, ray_direction):
     nearest = np.inf                             # the (squared) distance from the ray origin to the nearest point in the scene
     point,normal,color,hot = None,None,None,None # the information about the intersection point we want to return
-    for o in [ {'center': np.array([  6,   0,  7]), 'radius':  2, 'color': np.array([1., .4, .6]), 'hot': False}, # description of the scene:
-               {'center': np.array([2.8, 1.1,  7]), 'radius': .9, 'color': np.array([1., 1., .3]), 'hot': False}, # two spheres
-               {'center': np.array([  5, -10, -7]), 'radius':  8, 'color': np.array([1., 1., 1.]), 'hot': True},  # one of the spheres is "hot" (incandescent)
-               {'min': np.array([3, -4, 11]), 'max': np.array([ 7,   2, 13]), 'color': np.array([.4, .7, 1.]), 'hot': False},
-               {'min': np.array([0,  2,  6]), 'max': np.array([11, 2.2, 16]), 'color': np.array([.6, .7, .6]), 'hot': False} ]:
-        if 'center' in o: # is it a sphere or a box?
-            hit,p,n = sphere_intersect(o['center'], o['radius'], ray_origin, ray_direction)
+    for k in range(scene.nspheres + scene.nboxes): # the scene is compiled once, see scene.py
+        if k < scene.nspheres: # is it a sphere or a box?
+            hit,p,n = sphere_intersect(scene.center[k], scene.radius[k], ray_origin, ray_direction)
         else:
-            hit,p,n = box_intersect(o['min'], o['max'], ray_origin, ray_direction)
+            hit,p,n = box_intersect(scene.bmin[k-scene.nspheres], scene.bmax[k-scene.nspheres], ray_origin, ray_direction)
         if hit and (d2:=np.dot(p-ray_origin, p-ray_origin))<nearest: # we have encountered the closest point so far
-            nearest,point,normal,color,hot = d2,p,n,o['color'],o['hot']
+            nearest,point,normal,color,hot = d2,p,n,scene.color[k],scene.hot[k]
     return nearest<np.inf, point, normal, color, hot # hit or not, intersection point, normal at the point, color of the object
 
-def trace(eye, ray, depth):
-    hit,point,normal,color,hot = scene_intersect(eye, ray)             # find closest point along the ray
+def trace(scene, eye, ray, depth):
+    hit,point,normal,color,hot = scene_intersect(scene, eye, ray)      # find closest point along the ray
     if hot: return color
     if hit and depth+1<maxdepth:
-        return color * trace(point, reflect(ray, normal), depth+1) # accumulate color along the reflected ray
+        return color * trace(scene, point, reflect(ray, normal), depth+1) # accumulate color along the reflected ray
     return ambient_color                                           # no intersection
 
-width, height, depth = 640, 480, 500
-azimuth, ambient_color = 30*np.pi/180, np.array([.5]*3)
-image = np.zeros((height, width, 3))
-nrays, maxdepth = 10, 3
-
-for i in range(height):
-    for j in range(width):
-        ray = normalized(np.array([j-width/2, i-height/2, depth]))        # emit the ray along Z axis
-        ray[0],ray[2] = (np.cos(azimuth)*ray[0] + np.sin(azimuth)*ray[2], # and then rotate it 30 degrees around Y axis
-                        -np.sin(azimuth)*ray[0] + np.cos(azimuth)*ray[2])
+def shade(i, j, rng): # colors of the pixels (i[k], j[k]) of a tile, see tiles.py
+    color = np.zeros((len(i), 3))
+    for k,ray in enumerate(camera.directions(width, height, i, j)): # primary rays, all at once, see camera.py
         for r in range(nrays):
-            image[i, j] += trace(np.zeros(3), ray, 0)
-    print("%d/%d" % (i + 1, height))
+            color[k] += trace(scene, camera.position, ray, 0)
+    return color/nrays
 
-plt.imsave('result7.png', np.clip(image/nrays, 0, 1))
+width, height = 640, 480
+camera, ambient_color = Camera(azimuth=30*np.pi/180), np.array([.5]*3)
+nrays, maxdepth = 10, 3
+scene = Scene(tiny7)
 
+if __name__ == '__main__':
+    image = render(shade, width, height) # the tiles are rendered on all the cores
+    framebuffer.save('result7.png', image)